@@ -1,13 +1,11 @@
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Load environment variables from .env file
 load_dotenv()
 
-print(f"Attempting to load .env. Key found: {os.getenv('OPENAI_KEY_New')}")
-
 # --- OpenAI API Key Configuration ---
 OPENAI_API_KEY = os.getenv("OPENAI_KEY_New")
 
@@ -15,5 +13,13 @@ if not OPENAI_API_KEY:
     print("WARNING: OpenAI API key is not set in the environment or .env file.")
     OPENAI_API_KEY = "YOUR_OPENAI_API_KEY_FALLBACK_IF_NOT_SET"
 
-# Initialize client
-client = OpenAI(api_key=OPENAI_API_KEY)
+@lru_cache(maxsize=1)
+def get_openai_client():
+    """
+    Build the OpenAI client on first use.
+    Importing the SDK and constructing its HTTP client is deferred so that
+    importing settings stays cheap for code paths that never call OpenAI.
+    """
+    from openai import OpenAI
+
+    return OpenAI(api_key=OPENAI_API_KEY)
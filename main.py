@@ -1,12 +1,54 @@
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
 
 from routes.scan_routes import router as scan_router
+from services.cve_service import close_nvd_client
+from services.http_inspector import close_http_client
 
-app = FastAPI(title="VulnScan AI Backend", version="1.0.0")
+def configure_logging() -> None:
+    """
+    Send application log records through a queue so request handlers never block on
+    stream I/O; a QueueListener thread does the formatting and writing in the background.
+    """
+    root = logging.getLogger()
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    listener.start()
+    atexit.register(listener.stop)
+
+configure_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release application-lifetime HTTP clients on shutdown"""
+    yield
+    await close_nvd_client()
+    await close_http_client()
+
+# orjson encodes the large nested scan/CVE payloads several times faster than stdlib json
+app = FastAPI(
+    title="VulnScan AI Backend",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # Allowed origins for CORS - restrict to specific domains
 ALLOWED_ORIGINS = [
@@ -23,6 +65,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Let browsers cache preflight results (Chromium caps this at 2 hours)
+    # so JSON POSTs to /api/scan do not pay an extra OPTIONS round-trip each time
+    max_age=7200,
 )
 
 # Include API routers with /api prefix
@@ -36,6 +81,23 @@ async def read_root():
 async def health_check():
     return {"status": "healthy"}
 
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with long-lived browser/CDN caching for built assets.
+    Only files under assets/ are served as immutable (Vite fingerprints those
+    filenames); HTML entry points and unhashed files copied from public/
+    (favicon, robots.txt, ...) are always revalidated so new deploys are picked up.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        relative_path = os.path.relpath(full_path, os.path.realpath(self.directory))
+        if relative_path.startswith("assets" + os.sep):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
 # Mount static files AFTER API routes to avoid conflicts
 if os.path.exists("static"):
-    app.mount("/static", StaticFiles(directory="static", html=True), name="static")
+    app.mount("/static", CachedStaticFiles(directory="static", html=True), name="static")
@@ -1,9 +1,42 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ConfigDict, field_validator
 from typing import Optional
 import re
 import ipaddress
 
+# Dangerous nmap argument patterns that should never be allowed
+_DANGEROUS_ARG_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'--script',          # Custom script execution
+    r'-oN',               # Output to file
+    r'-oX',               # XML output to file
+    r'-oG',               # Grepable output to file
+    r'-oA',               # All output formats
+    r'--script-args',     # Script arguments
+    r'--datadir',         # Data directory manipulation
+    r'--system-dns',      # Use system DNS
+    r'[\$`;&|]',          # Shell metacharacters
+))
+
+# Safe standalone flags
+_SAFE_FLAGS = frozenset({
+    '-sV', '-O', '-A', '-Pn', '-n', '-sS', '-sT', '-sU', '-sN', '-sF', '-sX',
+    '-v', '-vv', '-vvv', '-F', '--open', '-r',
+})
+
+# Safe arguments that take a separate value (like -p 80,443)
+_SAFE_VALUE_ARGS = frozenset({'-p', '-T', '--top-ports', '--min-rate', '--max-retries', '--version-intensity'})
+
+# Safe single-token forms: timing templates (-T4), attached port specs (-p80,443),
+# bare port lists (value after -p) and value args written with '=' (--top-ports=100)
+_SAFE_TOKEN_RE = re.compile(
+    r'^(?:-T[0-5]|-p.+|[\d,\-]+|--(?:top-ports|min-rate|max-retries|version-intensity)=[\d.]+)$'
+)
+_DOMAIN_RE = re.compile(r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$')
+
 class ScanRequest(BaseModel):
+    # Whitespace stripping runs inside pydantic-core before the validators below,
+    # and requests are read-only once validated
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True)
+
     ip_address: str
     nmap_args: str = "-T4"  # Default nmap arguments
     scan_profile: str = "basic"  # Scan profile for reference
@@ -13,8 +46,6 @@ class ScanRequest(BaseModel):
     @classmethod
     def validate_ip_address(cls, v: str) -> str:
         """Validate IP address, CIDR notation, range, or domain name"""
-        v = v.strip()
-        
         if not v:
             raise ValueError("Target cannot be empty")
         
@@ -46,8 +77,7 @@ class ScanRequest(BaseModel):
                     pass
         
         # Check for valid domain name (allow scanme.nmap.org, example.com, etc.)
-        domain_pattern = r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$'
-        if re.match(domain_pattern, v) and '.' in v and len(v) <= 253:
+        if _DOMAIN_RE.match(v) and '.' in v and len(v) <= 253:
             return v
         
         raise ValueError(f"Invalid target format: {v}. Use IP (192.168.1.1), CIDR (192.168.1.0/24), range (192.168.1.1-10), or domain (example.com)")
@@ -56,75 +86,25 @@ class ScanRequest(BaseModel):
     @classmethod
     def validate_nmap_args(cls, v: str) -> str:
         """Validate nmap arguments - whitelist safe arguments only"""
-        # Dangerous patterns that should never be allowed
-        dangerous_patterns = [
-            r'--script',          # Custom script execution
-            r'-oN',               # Output to file
-            r'-oX',               # XML output to file
-            r'-oG',               # Grepable output to file
-            r'-oA',               # All output formats
-            r'--script-args',     # Script arguments
-            r'--datadir',         # Data directory manipulation
-            r'--system-dns',      # Use system DNS
-            r'[\$`;&|]',          # Shell metacharacters
-        ]
-        
         # Check for dangerous patterns
-        for pattern in dangerous_patterns:
-            if re.search(pattern, v, re.IGNORECASE):
-                raise ValueError(f"Unsafe nmap argument detected: matches pattern '{pattern}'")
-        
-        # Safe standalone flags
-        safe_flags = {
-            '-sV', '-O', '-A', '-Pn', '-n', '-sS', '-sT', '-sU', '-sN', '-sF', '-sX',
-            '-v', '-vv', '-vvv', '-F', '--open', '-r',
-        }
-        
-        # Safe arguments that take a value
-        safe_value_args = {'-p', '-T', '--top-ports', '--min-rate', '--max-retries', '--version-intensity'}
+        for pattern in _DANGEROUS_ARG_PATTERNS:
+            if pattern.search(v):
+                raise ValueError(f"Unsafe nmap argument detected: matches pattern '{pattern.pattern}'")
         
         args = v.split()
         i = 0
         while i < len(args):
             arg = args[i]
             
-            if not arg:
-                i += 1
-                continue
-            
-            # Check standalone safe flags
-            if arg in safe_flags:
-                i += 1
-                continue
-            
-            # Check timing flags -T0 through -T5
-            if re.match(r'^-T[0-5]$', arg):
-                i += 1
-                continue
-            
-            # Check combined port arg like -p80,443
-            if arg.startswith('-p') and len(arg) > 2:
+            if arg in _SAFE_FLAGS or _SAFE_TOKEN_RE.match(arg):
                 i += 1
                 continue
             
             # Check args that take values (like -p 80,443)
-            if arg in safe_value_args:
-                i += 1  # Move past the flag
-                if i < len(args):
-                    i += 1  # Skip the value
+            if arg in _SAFE_VALUE_ARGS:
+                i += 2  # Skip the flag and its value
                 continue
             
-            # Check if it looks like a port list (could be value after -p)
-            if re.match(r'^[\d,\-]+$', arg):
-                i += 1
-                continue
-            
-            # Check other safe value args with attached values
-            for prefix in ['--top-ports', '--min-rate', '--max-retries', '--version-intensity']:
-                if arg.startswith(prefix + '='):
-                    i += 1
-                    continue
-            
             raise ValueError(f"Nmap argument not allowed: '{arg}'. Only safe scanning arguments are permitted.")
         
         return v
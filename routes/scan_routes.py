@@ -1,12 +1,29 @@
 
 from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from models.scan_models import ScanRequest
-from services.scan_service import perform_network_scan
+from services.scan_service import MAX_CONCURRENT_SCANS, perform_network_scan, stream_network_scan
 from services.target_normalizer import normalize_target
-import traceback
+from typing import Any, Callable, Dict
+import asyncio
+import logging
+import orjson
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Caps concurrent nmap runs across both scan endpoints; extra requests get a 503
+# instead of piling more nmap processes onto the host
+_SCAN_SLOTS = asyncio.Semaphore(MAX_CONCURRENT_SCANS)
+
+def _reject_if_saturated() -> None:
+    """Fail fast when every scan slot is taken"""
+    if _SCAN_SLOTS.locked():
+        logger.warning("🚦 Scanner saturated - rejecting scan request")
+        raise HTTPException(status_code=503, detail="Scanner saturated, retry later")
+
 @router.post("/scan")
 async def scan_ip(request: ScanRequest):
     """
@@ -14,24 +31,27 @@ async def scan_ip(request: ScanRequest):
     Supports follow-up scans when request.follow_up=True
     Returns: { results: [...], nmap_cmd: "...", nmap_output: "...", target_info: {...} }
     """
+    _reject_if_saturated()
+
     try:
-        print(f"🔍 Received scan request: {request}")
+        logger.info("🔍 Received scan request: %s", request)
         
         # Normalize and validate target
         target_info = normalize_target(request.ip_address)
-        print(f"📍 Target normalized: {target_info['original']} -> {target_info['normalized']}")
+        logger.info("📍 Target normalized: %s -> %s", target_info['original'], target_info['normalized'])
         
         if target_info['warnings']:
             for warning in target_info['warnings']:
-                print(f"⚠️  {warning}")
+                logger.warning("⚠️  %s", warning)
         
         # Perform scan using normalized target
-        scan_data = perform_network_scan(
-            ip_address=target_info['normalized'],
-            nmap_args=request.nmap_args,
-            scan_profile=request.scan_profile,
-            follow_up=getattr(request, "follow_up", False)
-        )
+        async with _SCAN_SLOTS:
+            scan_data = await perform_network_scan(
+                ip_address=target_info['normalized'],
+                nmap_args=request.nmap_args,
+                scan_profile=request.scan_profile,
+                follow_up=getattr(request, "follow_up", False)
+            )
         
         # Include target normalization info in response
         scan_data['target_info'] = target_info
@@ -40,13 +60,83 @@ async def scan_ip(request: ScanRequest):
 
     except ValueError as e:
         # Target validation errors
-        print(f"❌ Invalid target: {e}")
+        logger.warning("❌ Invalid target: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f"❌ Scan error: {e}")
-        traceback.print_exc()
+        logger.exception("❌ Scan error: %s", e)
         raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
 
+class _SlotStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that calls on_close once the response is over, however it ends.
+    Starlette can cancel the send before the body iterator ever starts (client gone
+    right away), in which case the generator's own cleanup never runs.
+    """
+
+    def __init__(self, *args: Any, on_close: Callable[[], None], **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                # Run the generator's cleanup now instead of whenever it is collected
+                await self.body_iterator.aclose()
+            finally:
+                self.on_close()
+
+def _sse_event(event: str, payload: Dict[str, Any]) -> str:
+    """Frame a payload as a Server-Sent Events message"""
+    return f"event: {event}\ndata: {orjson.dumps(jsonable_encoder(payload)).decode()}\n\n"
+
+@router.post("/scan/stream")
+async def scan_ip_stream(request: ScanRequest):
+    """
+    Streaming variant of /scan using Server-Sent Events.
+    Emits `target`, then `scan` once nmap finishes, one `service` event per port
+    as soon as its CVE enrichment completes, and finally `done` (or `error`).
+    """
+    try:
+        target_info = normalize_target(request.ip_address)
+    except ValueError as e:
+        logger.warning("❌ Invalid target: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    _reject_if_saturated()
+    # Take the slot now rather than when the body starts streaming, so concurrent
+    # streams get the 503 instead of queueing; a free slot is acquired without waiting
+    await _SCAN_SLOTS.acquire()
+    released = False
+
+    def release_slot():
+        # Called by both the generator and the response, whichever finishes first
+        nonlocal released
+        if not released:
+            released = True
+            _SCAN_SLOTS.release()
+
+    async def event_stream():
+        try:
+            yield _sse_event("target", target_info)
+            async for event, payload in stream_network_scan(
+                ip_address=target_info['normalized'],
+                nmap_args=request.nmap_args,
+                scan_profile=request.scan_profile,
+                follow_up=getattr(request, "follow_up", False)
+            ):
+                yield _sse_event(event, payload)
+        finally:
+            release_slot()
+
+    return _SlotStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        on_close=release_slot
+    )
+
 @router.get("/scan/test")
 async def test_endpoint():
     """Test endpoint to verify the API is working"""
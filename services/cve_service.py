@@ -1,61 +1,243 @@
-import requests
-import traceback
+import asyncio
+import httpx
+import logging
+import orjson
 import os
+import random
 import time
-from typing import List, Dict, Any, Optional
-from supabase import create_client, Client
+from collections import Counter, OrderedDict, deque
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from services import nvd_cache
+
+logger = logging.getLogger(__name__)
 
 # 🚀 Supabase connection - read from environment variables
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-# Only create client if credentials are available
-supabase: Client = None
-if SUPABASE_URL and SUPABASE_KEY:
+@lru_cache(maxsize=1)
+def _supabase():
+    """
+    Build the Supabase client on first use, or return None when CVE storage is
+    unavailable. Deferred so importing this module stays cheap and the client
+    is only created once a scan actually has CVEs to store.
+    """
+    # Only create client if credentials are available
+    if not (SUPABASE_URL and SUPABASE_KEY):
+        logger.warning("⚠️ Supabase credentials not found - CVE storage disabled")
+        return None
+    
+    from supabase import create_client
+
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("✅ Supabase client initialized for CVE storage")
+        client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        logger.info("✅ Supabase client initialized for CVE storage")
+        return client
     except Exception as e:
-        print(f"⚠️ Failed to initialize Supabase client: {e}")
-else:
-    print("⚠️ Supabase credentials not found - CVE storage disabled")
+        logger.warning("⚠️ Failed to initialize Supabase client: %s", e)
+        return None
 
-def save_cves_to_supabase(cves: List[Dict[str, Any]]):
+def _cve_row(cve: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map an enriched CVE record onto a `cve` table row.
+    """
+    cve_id = cve["id"]
+    get = cve.get
+    return {
+        "cve_id": cve_id,
+        "title": get("title", cve_id),
+        "description": get("description", "No description"),
+        "cvss_score": get("cvss"),
+        "confidence": get("confidence", "low"),
+        "published_year": get("published_year")
+    }
+
+# CVE ids upserted recently -> time saved. The same CVE often turns up for several
+# services in one scan; repeats within the window are not written again.
+_recently_saved: "OrderedDict[str, float]" = OrderedDict()
+_SAVED_IDS_TTL = 3600
+_SAVED_IDS_MAX = 8192
+
+async def save_cves_to_supabase(cves: List[Dict[str, Any]]):
     """
     Save CVEs into Supabase `cve` table, avoiding duplicates.
+    supabase-py is synchronous, so the upsert runs on a worker thread.
     """
-    if not supabase:
-        print("⚠️ Supabase client not available - skipping CVE storage")
+    if not _supabase():
+        logger.debug("⚠️ Supabase client not available - skipping CVE storage")
         return
     
+    now = time.time()
+    fresh = {}
     for cve in cves:
+        cve_id = cve["id"]
+        saved_at = _recently_saved.get(cve_id)
+        if saved_at is None or now - saved_at >= _SAVED_IDS_TTL:
+            fresh[cve_id] = cve
+    if not fresh:
+        logger.debug("💾 All %d CVEs already saved recently - skipping upsert", len(cves))
+        return
+    
+    saved_ids = await asyncio.to_thread(_upsert_cves, list(fresh.values()))
+    
+    for cve_id in saved_ids:
+        _recently_saved[cve_id] = now
+        _recently_saved.move_to_end(cve_id)
+    while len(_recently_saved) > _SAVED_IDS_MAX:
+        _recently_saved.popitem(last=False)
+
+# Rows per upsert request; keeps payloads well inside PostgREST request limits
+_UPSERT_CHUNK_SIZE = 1000
+
+def _upsert_cves(cves: List[Dict[str, Any]]) -> List[str]:
+    """
+    Blocking upsert of CVEs into the `cve` table; returns the ids that were stored.
+    Rows go out in chunks of _UPSERT_CHUNK_SIZE, one request each; if a chunk
+    fails, its rows are retried one by one so a single bad record does not drop
+    the rest.
+    PostgREST is asked not to echo the stored rows back, since nothing reads them.
+    """
+    # Imported here with the client itself, so the Supabase stack is only loaded
+    # once there are CVEs to store
+    from postgrest.types import ReturnMethod
+
+    supabase = _supabase()
+    rows = [_cve_row(cve) for cve in cves]
+    saved = []
+    for start in range(0, len(rows), _UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + _UPSERT_CHUNK_SIZE]
         try:
-            supabase.table("cve").upsert({
-                "cve_id": cve["id"],
-                "title": cve.get("title", cve["id"]),
-                "description": cve.get("description", "No description"),
-                "cvss_score": cve.get("cvss", None),
-                "confidence": cve.get("confidence", "low"),
-                "published_year": cve.get("published_year", None)
-            }, on_conflict=["cve_id"]).execute()
-            print(f"💾 Saved {cve['id']} into Supabase (confidence: {cve.get('confidence', 'low')})")
+            supabase.table("cve").upsert(
+                chunk, on_conflict="cve_id", returning=ReturnMethod.minimal
+            ).execute()
+            saved.extend(row["cve_id"] for row in chunk)
+            continue
         except Exception as e:
-            print(f"⚠️ Failed to save {cve['id']} - {e}")
+            logger.warning("⚠️ Batch save of %d CVEs failed, retrying per row - %s", len(chunk), e)
+        
+        for row in chunk:
+            try:
+                supabase.table("cve").upsert(
+                    row, on_conflict="cve_id", returning=ReturnMethod.minimal
+                ).execute()
+                saved.append(row["cve_id"])
+            except Exception as e:
+                logger.warning("⚠️ Failed to save %s - %s", row['cve_id'], e)
+    
+    logger.info("💾 Saved %d/%d CVEs into Supabase", len(saved), len(rows))
+    return saved
+
+# NVD API endpoint
+NVD_API_URL = "https://services.nvd.nist.gov/rest/json/cves/2.0"
 
-# In-memory cache for CVE results to respect NVD rate limits
-# Cache key: (service_name, version) -> (cves, timestamp)
-_cve_cache: Dict[tuple, tuple] = {}
-_cache_ttl = 3600  # 1 hour cache
+# Optional NVD API key; raises the rate limit from 5 to 50 requests per 30 seconds
+NVD_API_KEY = os.getenv("NVD_API_KEY")
+
+# Rolling-window rate limit enforced across every NVD request in the process
+# (one second of slack on NVD's 30s window to absorb clock and network jitter)
+_NVD_RATE_LIMIT = 50 if NVD_API_KEY else 5
+_NVD_RATE_WINDOW = 31
+
+# Entries fetched per query; each search is a single page, so this bounds how much of
+# a product's history one rate-limited request can cover (NVD allows up to 2000)
+_NVD_RESULTS_PER_PAGE = 50
+
+_NVD_HEADERS = {"User-Agent": "sightline/1.0"}
+if NVD_API_KEY:
+    _NVD_HEADERS["apiKey"] = NVD_API_KEY
+
+# NVD metric blocks in order of preference (newest CVSS version first),
+# paired with the version label reported in cvss_details
+_CVSS_METRIC_KEYS = (
+    ("cvssMetricV31", "V31"),
+    ("cvssMetricV30", "V30"),
+    ("cvssMetricV2", "V2"),
+)
+
+# Shared async client so NVD lookups reuse TCP/TLS connections across scans.
+# Idle connections must outlive the rate-limit waits above, otherwise every
+# paced query pays a fresh TLS handshake (httpx expires them after 5s by default).
+# The transport retries failed connection attempts; HTTP-level retries are in _query_nvd.
+# HTTP/2 (httpx[http2]) multiplexes a scan's concurrent queries over one connection.
+_nvd_client = httpx.AsyncClient(
+    timeout=10,
+    headers=_NVD_HEADERS,
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=60),
+    ),
+)
+
+# Retry policy for rate-limited or failing NVD requests
+# (NVD answers 403 rather than 429 when a client exceeds its rate limit)
+_NVD_MAX_ATTEMPTS = 4
+_NVD_RETRY_STATUSES = frozenset({403, 429, 500, 502, 503, 504})
+_NVD_BACKOFF_BASE = 1.0
+_NVD_BACKOFF_MAX = 16.0
+
+# Caps in-flight NVD requests across all concurrently enriched ports
+_NVD_MAX_IN_FLIGHT = 8
+_nvd_slots = asyncio.Semaphore(_NVD_MAX_IN_FLIGHT)
+
+# Send times reserved by the most recent _NVD_RATE_LIMIT requests, oldest first
+_nvd_send_times: "deque[float]" = deque(maxlen=_NVD_RATE_LIMIT)
+
+async def close_nvd_client() -> None:
+    """
+    Close the shared NVD client and its pooled connections (called on app shutdown).
+    """
+    await _nvd_client.aclose()
+
+# Lookups currently talking to NVD, keyed like the cache
+_inflight_lookups: Dict[tuple, "asyncio.Future[List[Dict[str, Any]]]"] = {}
+
+# In-memory LRU cache for CVE results to respect NVD rate limits
+# Cache key: (service_name, version) lower-cased -> (cves, expires_at)
+_cve_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_cache_ttl = 24 * 3600  # NVD data changes slowly - keep results for a day
+_cache_negative_ttl = 3600  # Empty results expire sooner in case NVD catches up
+_cache_max_entries = 1024
+
+def _cache_get(key: tuple) -> Optional[List[Dict[str, Any]]]:
+    """
+    Return cached CVEs for key, or None when missing or expired.
+    """
+    entry = _cve_cache.get(key)
+    if entry is None:
+        return None
+    
+    cves, expires_at = entry
+    if time.time() >= expires_at:
+        del _cve_cache[key]
+        return None
+    
+    _cve_cache.move_to_end(key)
+    return cves
+
+def _cache_set(key: tuple, cves: List[Dict[str, Any]], complete: bool = True):
+    """
+    Store CVEs for key, evicting the least recently used entries beyond the size limit.
+    Empty or incomplete results (some NVD queries failed) use the shorter negative TTL.
+    """
+    ttl = _cache_ttl if cves and complete else _cache_negative_ttl
+    _cve_cache[key] = (cves, time.time() + ttl)
+    _cve_cache.move_to_end(key)
+    while len(_cve_cache) > _cache_max_entries:
+        _cve_cache.popitem(last=False)
 
-def parse_version(version_str: str) -> List[int]:
+@lru_cache(maxsize=4096)
+def parse_version(version_str: str) -> Tuple[int, ...]:
     """
-    Parse version string into comparable list of integers.
-    Examples: "2.10.5" -> [2, 10, 5], "1.0" -> [1, 0]
+    Parse version string into comparable tuple of integers.
+    Examples: "2.10.5" -> (2, 10, 5), "1.0" -> (1, 0)
+    The same scanned versions and CPE range bounds recur across CVEs, so parses are memoized.
     """
     try:
-        return [int(part) for part in version_str.replace('-', '.').split('.') if part.isdigit()]
+        return tuple(int(part) for part in version_str.replace('-', '.').split('.') if part.isdigit())
     except (ValueError, AttributeError):
-        return []
+        return ()
 
 def compare_versions(v1: str, v2: str) -> int:
     """
@@ -65,10 +247,10 @@ def compare_versions(v1: str, v2: str) -> int:
     parts1 = parse_version(v1)
     parts2 = parse_version(v2)
     
-    # Pad shorter version with zeros
+    # Pad shorter version with zeros (new tuples - the cached parses stay untouched)
     max_len = max(len(parts1), len(parts2))
-    parts1.extend([0] * (max_len - len(parts1)))
-    parts2.extend([0] * (max_len - len(parts2)))
+    parts1 += (0,) * (max_len - len(parts1))
+    parts2 += (0,) * (max_len - len(parts2))
     
     if parts1 < parts2:
         return -1
@@ -95,10 +277,364 @@ def is_version_in_range(version: str, start: Optional[str], end: Optional[str])
     
     return True
 
-def fetch_cves_for_service(
+def cpe_to_match_string(cpe: Optional[str]) -> Optional[str]:
+    """
+    Convert an nmap CPE 2.2 URI into an NVD CPE 2.3 match string.
+
+    Examples:
+        "cpe:/a:openbsd:openssh:8.2p1" -> "cpe:2.3:a:openbsd:openssh:8.2p1"
+        "cpe:/a:nginx:nginx" -> None (no version, keyword search is used instead)
+
+    Returns:
+        Match string usable as NVD's virtualMatchString, or None.
+    """
+    if not cpe or not cpe.startswith("cpe:/"):
+        return None
+
+    parts = cpe[len("cpe:/"):].split(":")
+    if len(parts) < 4 or not all(parts[:4]):
+        return None
+
+    return "cpe:2.3:" + ":".join(parts[:4]).lower()
+
+# Products NVD has filed under more than one vendor over time; a CPE naming any
+# of them is queried under each vendor:product listed (nmap reports igor_sysoev:nginx,
+# older NVD entries use nginx:nginx and newer ones f5:nginx)
+_CPE_PRODUCT_ALIASES = {
+    "nginx": ("nginx:nginx", "f5:nginx"),
+}
+
+def _cpe_match_strings(cpe: Optional[str]) -> Tuple[str, ...]:
+    """
+    Return the NVD match strings to query for an nmap CPE: its own match string,
+    or one per vendor alias for products listed in _CPE_PRODUCT_ALIASES.
+    """
+    match_string = cpe_to_match_string(cpe)
+    if not match_string:
+        return ()
+    _, _, part, _, product, version = match_string.split(":")
+    aliases = _CPE_PRODUCT_ALIASES.get(product) if part == "a" else None
+    if not aliases:
+        return (match_string,)
+    return tuple(f"cpe:2.3:{part}:{vendor_product}:{version}" for vendor_product in aliases)
+
+def _cpe_product_token(match_string: str) -> str:
+    """
+    Return the ":vendor:product:" part of a CPE 2.3 match string, which is what
+    NVD's own configuration criteria carry for that product.
+
+    Example:
+        "cpe:2.3:a:apache:http_server:2.4.49" -> ":apache:http_server:"
+    """
+    parts = match_string.split(":")
+    return f":{parts[3]}:{parts[4]}:"
+
+# nmap service names that describe a port role rather than a product; a keyword
+# search on them only returns noise
+_GENERIC_SERVICES = frozenset({
+    "", "unknown", "upnp", "http-alt", "http-proxy", "https-alt", "ppp", "cslistener", "tcpwrapped",
+})
+
+@lru_cache(maxsize=1024)
+def _build_nvd_queries(service_name: str) -> Tuple[str, ...]:
+    """
+    Keyword searches to issue for a service, deduplicated and in priority order.
+    Common products repeat across every scan, so the result is memoized.
+    """
+    # Generate multiple search variations for better coverage
+    search_terms = [service_name]
+
+    # Add known product name variations
+    service_lower = service_name.lower()
+    if "big-ip" in service_lower or "f5" in service_lower:
+        search_terms.extend(["f5", "big-ip", "f5 big-ip"])
+    elif "apache" in service_lower or "httpd" in service_lower:
+        search_terms.extend(["apache", "httpd", "apache httpd"])
+    elif "nginx" in service_lower:
+        search_terms.append("nginx")
+
+    # NVD keyword search ignores case, so "Apache httpd" and "apache httpd" are the
+    # same query; keep the first spelling of each
+    unique_terms = {}
+    for term in search_terms:
+        if term:
+            unique_terms.setdefault(term.lower(), term)
+    return tuple(unique_terms.values())
+
+def _cvss_severity(score: float) -> str:
+    """
+    Map a CVSS base score onto its qualitative severity band.
+    """
+    if score >= 9.0:
+        return "CRITICAL"
+    if score >= 7.0:
+        return "HIGH"
+    if score >= 4.0:
+        return "MEDIUM"
+    return "LOW"
+
+def _extract_cvss(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pull score, version, vector and severity from the preferred CVSS metric block.
+    """
+    cvss_info = {'score': None, 'version': None, 'vector': None, 'severity': None}
+    
+    for metric_type, metric_version in _CVSS_METRIC_KEYS:
+        metric_list = metrics.get(metric_type)
+        if not metric_list:
+            continue
+        cvss_data = metric_list[0].get("cvssData")
+        if not cvss_data:
+            continue
+        
+        score = cvss_data.get("baseScore")
+        cvss_info['score'] = score
+        cvss_info['version'] = metric_version
+        cvss_info['vector'] = cvss_data.get("vectorString")
+        if score is not None:
+            cvss_info['severity'] = _cvss_severity(score)
+            break
+    
+    return cvss_info
+
+def _iter_cpe_matches(configurations: List[Dict[str, Any]]):
+    """
+    Yield every cpeMatch entry across a CVE's configuration nodes.
+    """
+    for config in configurations:
+        for node in config.get("nodes", []):
+            yield from node.get("cpeMatch", [])
+
+def _match_cpe_configurations(
+    configurations: List[Dict[str, Any]],
+    product_terms: Tuple[str, ...],
+    version_lower: str
+) -> Tuple[bool, bool]:
+    """
+    Check a CVE's CPE configurations against a product, given as one or more
+    terms (a lower-cased service name and/or ":vendor:product:" CPE tokens).
+    
+    Returns:
+        (has_product_match, has_version_match); stops at the first version match,
+        or at the first product match when there is no version to check
+    """
+    version_token = f":{version_lower}"
+    has_product_match = False
+    for cpe_match in _iter_cpe_matches(configurations):
+        cpe_criteria = cpe_match.get("criteria", "").lower()
+        if not any(term in cpe_criteria for term in product_terms):
+            continue
+        has_product_match = True
+        
+        # Without a version nothing later in the walk can change the answer
+        if not version_lower:
+            return True, False
+        
+        # Check exact version match in CPE
+        if version_token in cpe_criteria:
+            return True, True
+        
+        # Check version range with semantic comparison
+        version_start = cpe_match.get("versionStartIncluding") or cpe_match.get("versionStartExcluding")
+        version_end = cpe_match.get("versionEndIncluding") or cpe_match.get("versionEndExcluding")
+        if (version_start or version_end) and is_version_in_range(version_lower, version_start, version_end):
+            return True, True
+    
+    return has_product_match, False
+
+def _nvd_retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """
+    Seconds to wait before retry `attempt` (0-based): the server's Retry-After when
+    it sends one, otherwise jittered exponential backoff.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), _NVD_BACKOFF_MAX * 2)
+    
+    backoff = min(_NVD_BACKOFF_MAX, _NVD_BACKOFF_BASE * 2 ** attempt)
+    return backoff * random.uniform(0.5, 1.0)
+
+async def _wait_for_nvd_turn() -> None:
+    """
+    Reserve the next send time allowed by NVD's rolling rate limit and sleep until it.
+    Shared by all lookups, so concurrent scans cannot jointly exceed the limit; a
+    burst up to the limit goes out immediately.
+    """
+    now = time.monotonic()
+    send_at = now
+    if len(_nvd_send_times) == _NVD_RATE_LIMIT:
+        send_at = max(now, _nvd_send_times[0] + _NVD_RATE_WINDOW)
+    _nvd_send_times.append(send_at)
+    if send_at > now:
+        await asyncio.sleep(send_at - now)
+
+async def _query_nvd(
+    service_term: str,
+    search_param: str = "keywordSearch"
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Run a single NVD search and return its raw vulnerability entries.
+    `search_param` selects the NVD filter (keywordSearch or virtualMatchString).
+    Timeouts, rate limiting and 5xx responses are retried with backoff; errors that
+    persist are logged and yield None so sibling queries still count and callers
+    can tell a failed lookup from an empty one.
+    Every request, retries included, waits for its turn under the shared rate limit.
+    Successful responses are kept in the on-disk NVD cache; a hit skips both the
+    request and the rate-limit wait.
+    """
+    disk_key = f"{search_param}:{service_term}"
+    cached_vulns = await asyncio.to_thread(nvd_cache.load_response, disk_key)
+    if cached_vulns is not None:
+        logger.debug("💾 NVD disk cache hit for '%s'", service_term)
+        return cached_vulns
+
+    params = {"resultsPerPage": _NVD_RESULTS_PER_PAGE, search_param: service_term}
+    logger.debug("🔍 Searching CVEs - Query: '%s'", service_term)
+
+    for attempt in range(_NVD_MAX_ATTEMPTS):
+        retries_left = attempt < _NVD_MAX_ATTEMPTS - 1
+        try:
+            # ⏰ RATE LIMITING: pace requests process-wide to stay within NVD limits
+            await _wait_for_nvd_turn()
+            async with _nvd_slots:
+                response = await _nvd_client.get(NVD_API_URL, params=params)
+            
+            if response.status_code in _NVD_RETRY_STATUSES and retries_left:
+                wait = _nvd_retry_delay(attempt, response)
+                logger.info("🔁 NVD returned %d for '%s' - retrying in %.1fs",
+                            response.status_code, service_term, wait)
+                await asyncio.sleep(wait)
+                continue
+            response.raise_for_status()
+
+            data = orjson.loads(response.content)
+            current_vulns = data.get("vulnerabilities", [])
+            logger.debug("  Found %d CVEs for '%s'", len(current_vulns), service_term)
+            await asyncio.to_thread(nvd_cache.store_response, disk_key, current_vulns)
+            return current_vulns
+
+        except httpx.TimeoutException:
+            if retries_left:
+                wait = _nvd_retry_delay(attempt)
+                logger.info("🔁 Timeout fetching CVEs for '%s' - retrying in %.1fs", service_term, wait)
+                await asyncio.sleep(wait)
+                continue
+            logger.warning("⏰ Timeout fetching CVEs for %s", service_term)
+        except httpx.HTTPError as e:
+            logger.warning("❌ Network error fetching CVEs for %s: %s", service_term, e)
+        return None
+
+# Sort weight of each confidence level (best first after reversing)
+_CONFIDENCE_RANK = {"high": 3, "medium": 2, "low": 1}
+
+def _score_cves(
+    result_sets: List[Optional[List[Dict[str, Any]]]],
+    service_name: str,
+    version: Optional[str],
+    cpe_results: Sequence[Tuple[str, Optional[List[Dict[str, Any]]]]] = ()
+) -> List[Dict[str, Any]]:
+    """
+    Merge raw NVD result sets and turn them into scored CVE records, best first.
+    Failed queries (None) are skipped. Deduplication, filtering and scoring
+    happen in one pass; each entry is rejected at the first failing check.
+    
+    cpe_results pairs each virtualMatchString query with its results. NVD already
+    matched those on the CPE's vendor:product, whose naming rarely contains the
+    service name (e.g. "Apache httpd" vs apache:http_server), so they are matched
+    on the CPE's product and only the version is checked. Keyword results are
+    matched on the service name or, when CPE queries were made, on those products.
+    """
+    # Initialize variables at function start to avoid NameError
+    matched_products = set()
+    
+    service_lower = service_name.lower()
+    version_lower = version.lower() if version and version.lower() != "unknown" else ""
+    seen_ids = set()
+    skipped = Counter()
+    cves = []
+    cpe_products = tuple(_cpe_product_token(match_string) for match_string, _ in cpe_results)
+    tagged_vulns = [((cpe_product,), current_vulns or ())
+                    for cpe_product, (_, current_vulns) in zip(cpe_products, cpe_results)]
+    keyword_terms = (service_lower, *cpe_products)
+    tagged_vulns.extend((keyword_terms, current_vulns or ()) for current_vulns in result_sets)
+    for product_terms, vuln in ((terms, vuln) for terms, current_vulns in tagged_vulns for vuln in current_vulns):
+        cve_data = vuln.get("cve", {})
+        cve_id = cve_data.get("id")
+        
+        # The same CVE often comes back from several search variations
+        if not cve_id or cve_id in seen_ids:
+            skipped["duplicate"] += 1
+            continue
+        seen_ids.add(cve_id)
+        
+        # Extract publication date for age filtering
+        published_date = cve_data.get("published", "")
+        if published_date:
+            year = int(published_date[:4])
+        else:
+            year = 2025  # Default to current year if not available
+        
+        # Calculate confidence score based on CPE product/version matches
+        has_product_match, has_version_match = _match_cpe_configurations(
+            cve_data.get("configurations", []), product_terms, version_lower
+        )
+        confidence = "high" if has_version_match else "low"
+        if has_product_match:
+            matched_products.add(product_terms[0].strip(":"))
+        
+        # STRICT GATING: If we have a version but no version match, skip this CVE
+        # This prevents false positives like showing CVE for Apache 2.2.9 when scanning 2.4.7
+        if version_lower:
+            if not has_version_match:
+                skipped["version_mismatch"] += 1
+                continue
+        elif has_product_match and not has_version_match:
+            confidence = "medium"
+            
+        # Skip very old CVEs if confidence is not high
+        if confidence != "high" and year < 2010:
+            skipped["too_old"] += 1
+            continue
+        
+        # Description and CVSS are parsed only for CVEs that passed the filters above
+        description = next(
+            (desc.get("value", "No description available")
+             for desc in cve_data.get("descriptions", []) if desc.get("lang") == "en"),
+            "No description available"
+        )
+        
+        # Extract CVSS information
+        cvss_info = _extract_cvss(cve_data.get("metrics", {}))
+        cvss = cvss_info['score']
+        
+        # Build enriched CVE record
+        cves.append({
+            "id": cve_id,
+            "title": cve_id,
+            "description": description,
+            "cvss": cvss,
+            "confidence": confidence,
+            "published_year": year,
+            "matched_products": list(matched_products),
+            "cvss_details": cvss_info
+        })
+    
+    # One summary line per lookup instead of a log call per rejected CVE
+    logger.info("📊 Scored CVEs for %s %s: kept=%d duplicate=%d version_mismatch=%d too_old=%d",
+                service_name, version, len(cves),
+                skipped["duplicate"], skipped["version_mismatch"], skipped["too_old"])
+    
+    # Sort by confidence and CVSS score
+    cves.sort(key=lambda x: (_CONFIDENCE_RANK[x["confidence"]], x["cvss"] or 0), reverse=True)
+    
+    return cves
+
+async def fetch_cves_for_service(
     service_name: str, 
     version: Optional[str] = None,
-    require_version: bool = True
+    require_version: bool = True,
+    cpe: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Fetch and filter CVEs for a given service and version from NVD API,
@@ -108,236 +644,116 @@ def fetch_cves_for_service(
         service_name: Product name (e.g., "apache_httpd", "nginx")
         version: Version string (can be None)
         require_version: If True, skip lookup when version is missing (default: True)
+        cpe: nmap CPE for the service; when it carries a version, NVD is also queried
+             by CPE match and those results are merged with the keyword searches
     
     Returns:
         List of CVE dictionaries with confidence scoring
     """
-    # Initialize variables at function start to avoid NameError
-    matched_products = set()
-    cvss_info = {'score': None, 'version': None, 'vector': None, 'severity': None}
+    # Generic port-role names cannot be searched meaningfully unless nmap gave a CPE
+    if not cpe and service_name.lower() in _GENERIC_SERVICES:
+        logger.info("🚫 Skipping CVE lookup for generic service '%s'", service_name)
+        return []
+    
+    # Gating logic: skip lookup if version is unknown or empty and required
+    if require_version and (not version or version.lower() == "unknown"):
+        logger.info("🚫 Gated CVE lookup: %s has no version - skipping to avoid false positives", service_name)
+        return []
     
+    # Check cache first; the CPE decides which match-string queries are scored,
+    # so it is part of the key (normalized, so equivalent CPEs share an entry)
+    cache_key = (service_name.lower(), (version or "").lower(), cpe_to_match_string(cpe) or "")
+    cached_cves = _cache_get(cache_key)
+    if cached_cves is not None:
+        logger.info("💾 Using cached CVE results for %s %s", service_name, version)
+        return list(cached_cves)
+    
+    # Coalesce identical lookups (e.g. several ports running the same server) onto
+    # one in-flight NVD fetch instead of issuing the same queries N times
+    lookup = _inflight_lookups.get(cache_key)
+    if lookup is None:
+        lookup = asyncio.ensure_future(_lookup_cves(service_name, version, cpe, cache_key))
+        _inflight_lookups[cache_key] = lookup
+        lookup.add_done_callback(lambda _: _inflight_lookups.pop(cache_key, None))
+    else:
+        logger.info("⏳ Joining in-flight CVE lookup for %s %s", service_name, version)
+    
+    # Shielded so one cancelled scan does not abort a lookup other scans are awaiting.
+    # The cached/coalesced list is shared, so every caller gets its own copy of it
+    return list(await asyncio.shield(lookup))
+
+async def _lookup_cves(
+    service_name: str,
+    version: Optional[str],
+    cpe: Optional[str],
+    cache_key: tuple
+) -> List[Dict[str, Any]]:
+    """
+    Query NVD for a service, score and persist the matches, and cache the result.
+    Scored results are also kept in the on-disk cache, so they survive restarts.
+    """
     try:
-        # Gating logic: skip lookup if version is unknown or empty and required
-        if require_version and (not version or version.lower() == "unknown"):
-            print(f"🚫 Gated CVE lookup: {service_name} has no version - skipping to avoid false positives")
-            return []
-        
-        # Check cache first
-        cache_key = (service_name, version or "")
-        if cache_key in _cve_cache:
-            cached_cves, cached_time = _cve_cache[cache_key]
-            if time.time() - cached_time < _cache_ttl:
-                print(f"💾 Using cached CVE results for {service_name} {version}")
-                return cached_cves
-
-        print(f"🔎 Fetching CVEs for service: {service_name}, version: {version}")
-            
-        # NVD API endpoint
-        url = "https://services.nvd.nist.gov/rest/json/cves/2.0"
-        
-        # Generate multiple search variations for better coverage
-        search_terms = [(service_name, version or "")]
-        
-        # Add known product name variations
-        service_lower = service_name.lower()
-        if "big-ip" in service_lower or "f5" in service_lower:
-            search_terms.extend([("f5", ""), ("big-ip", ""), ("f5 big-ip", "")])
-        elif "apache" in service_lower or "httpd" in service_lower:
-            search_terms.extend([("apache", ""), ("httpd", ""), ("apache httpd", "")])
-        elif "nginx" in service_lower:
-            search_terms.append(("nginx", ""))
-        
-        # Track queries to avoid duplicates
-        seen_queries = set()
-        all_cves = []
-        
-        # Try each search term combination
-        for idx, (service_term, version_term) in enumerate(search_terms):
-            if not service_term:
-                continue
-            
-            # Create cache key to avoid duplicate queries
-            query_key = f"{service_term}:{version_term}"
-            if query_key in seen_queries:
-                continue
-            seen_queries.add(query_key)
-            
-            # Build query parameters
-            params = {"resultsPerPage": 15, "keywordSearch": service_term}
-            
-            print(f"🔍 Searching CVEs - Query: '{service_term}'")
-            
-            # ⏰ RATE LIMITING: Wait 6 seconds between API calls (NVD allows 5 requests per 30 seconds)
-            if idx > 0:
-                print("⏰ Rate limiting: waiting 6 seconds...")
-                time.sleep(6)
-            
-            # Make API request
-            try:
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                
-                data = response.json()
-                current_vulns = data.get("vulnerabilities", [])
-                
-                # Add new vulnerabilities, avoiding duplicates
-                for vuln in current_vulns:
-                    cve_id = vuln.get("cve", {}).get("id")
-                    if cve_id and not any(c.get("cve", {}).get("id") == cve_id for c in all_cves):
-                        all_cves.append(vuln)
-                
-                print(f"  Found {len(current_vulns)} CVEs for '{service_term}'")
-            
-            except requests.exceptions.Timeout:
-                print(f"⏰ Timeout fetching CVEs for {service_term}")
-                continue
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Network error fetching CVEs for {service_term}: {e}")
-                continue
-        
-        # Process and score all collected CVEs
-        cves = []
-        for vuln in all_cves:
-            cve_data = vuln.get("cve", {})
-            cve_id = cve_data.get("id", "Unknown")
-            
-            # Extract publication date for age filtering
-            published_date = cve_data.get("published", "")
-            if published_date:
-                year = int(published_date[:4])
-            else:
-                year = 2025  # Default to current year if not available
-            
-            # Get descriptions
-            descriptions = cve_data.get("descriptions", [])
-            description = "No description available"
-            for desc in descriptions:
-                if desc.get("lang") == "en":
-                    description = desc.get("value", "No description available")
-                    break
-                    
-            # Calculate confidence score based on matches
-            confidence = "low"
-            has_product_match = False
-            has_version_match = False
-            
-            # Check configurations for exact product and version matches
-            configurations = cve_data.get("configurations", [])
-            for config in configurations:
-                for node in config.get("nodes", []):
-                    for cpe_match in node.get("cpeMatch", []):
-                        cpe_criteria = cpe_match.get("criteria", "").lower()
-                        service_lower = service_name.lower()
-                        
-                        # Product matching
-                        if service_lower in cpe_criteria:
-                            has_product_match = True
-                            matched_products.add(service_lower)
-                            
-                            # Version matching with semantic comparison
-                            if version and version.lower() != "unknown":
-                                version_start = cpe_match.get("versionStartIncluding") or cpe_match.get("versionStartExcluding")
-                                version_end = cpe_match.get("versionEndIncluding") or cpe_match.get("versionEndExcluding")
-                                
-                                # Check exact version match in CPE
-                                if f":{version.lower()}" in cpe_criteria:
-                                    has_version_match = True
-                                    confidence = "high"
-                                    break
-                                
-                                # Check version range with semantic comparison
-                                elif version_start or version_end:
-                                    if is_version_in_range(version, version_start, version_end):
-                                        has_version_match = True
-                                        confidence = "high"
-                                        break
-                    
-                    if has_version_match:
-                        break
-                if has_version_match:
-                    break
-            
-            # STRICT GATING: If we have a version but no version match, skip this CVE
-            # This prevents false positives like showing CVE for Apache 2.2.9 when scanning 2.4.7
-            if version and version.lower() != "unknown":
-                if not has_version_match:
-                    print(f"  ❌ Skipping {cve_id}: no version match for {version}")
-                    continue
-            elif has_product_match and not has_version_match:
-                confidence = "medium"
-                
-            # Skip very old CVEs if confidence is not high
-            if confidence != "high" and year < 2010:
-                continue
-            
-            # Extract CVSS information
-            metrics = cve_data.get("metrics", {})
-            cvss_info = {'score': None, 'version': None, 'vector': None, 'severity': None}
-            
-            # Try CVSS versions in order of preference
-            for metric_type in ["cvssMetricV31", "cvssMetricV30", "cvssMetricV2"]:
-                if metric_type in metrics and metrics[metric_type]:
-                    metric = metrics[metric_type][0]
-                    cvss_data = metric.get("cvssData", {})
-                    
-                    if cvss_data:
-                        cvss_info['score'] = cvss_data.get("baseScore")
-                        cvss_info['version'] = metric_type.replace("cvssMetric", "")
-                        cvss_info['vector'] = cvss_data.get("vectorString")
-                        
-                        # Determine severity
-                        if cvss_info['score'] is not None:
-                            if cvss_info['score'] >= 9.0:
-                                cvss_info['severity'] = "CRITICAL"
-                            elif cvss_info['score'] >= 7.0:
-                                cvss_info['severity'] = "HIGH"
-                            elif cvss_info['score'] >= 4.0:
-                                cvss_info['severity'] = "MEDIUM"
-                            else:
-                                cvss_info['severity'] = "LOW"
-                            break
-            
-            cvss = cvss_info['score']
-            
-            # Build enriched CVE record
-            cves.append({
-                "id": cve_id,
-                "title": cve_data.get("id", "Unknown CVE"),
-                "description": description,
-                "cvss": cvss,
-                "confidence": confidence,
-                "published_year": year,
-                "matched_products": list(matched_products),
-                "cvss_details": cvss_info
-            })
+        # Same CPE-aware key as the memory cache; "|" keeps the CPE's own colons
+        # from running into the service and version fields
+        disk_key = "scored:" + "|".join(cache_key)
+        stored_cves = await asyncio.to_thread(nvd_cache.load_response, disk_key)
+        if stored_cves is not None:
+            logger.info("💾 Using stored CVE results for %s %s", service_name, version)
+            _cache_set(cache_key, stored_cves)
+            # The earlier save may have failed or had no Supabase to go to;
+            # recently saved IDs are skipped inside, so this is cheap when it worked
+            if stored_cves:
+                await save_cves_to_supabase(stored_cves)
+            return stored_cves
+
+        logger.info("🔎 Fetching CVEs for service: %s, version: %s", service_name, version)
+
+        # A versioned CPE lets NVD do the product/version matching server-side, but
+        # only for the vendor:product it names, so keyword searches still run and
+        # both answers are merged
+        match_strings = _cpe_match_strings(cpe)
+        queries = _build_nvd_queries(service_name)
+
+        # Issue all search variations concurrently instead of one after another
+        results = await asyncio.gather(
+            *(_query_nvd(match_string, search_param="virtualMatchString") for match_string in match_strings),
+            *(_query_nvd(service_term) for service_term in queries)
+        )
+        cpe_results = list(zip(match_strings, results))
+        query_results = results[len(match_strings):]
+        # Every query errored - an empty answer here says nothing about the service
+        lookup_failed = all(current_vulns is None for current_vulns in results)
+        lookup_partial = any(current_vulns is None for current_vulns in results)
         
-        # Sort by confidence and CVSS score
-        cves.sort(key=lambda x: (
-            {"high": 3, "medium": 2, "low": 1}[x["confidence"]], 
-            x.get("cvss", 0) or 0
-        ), reverse=True)
+        # Merging and scoring is pure CPU work - keep it off the event loop
+        cves = await asyncio.to_thread(
+            _score_cves, query_results, service_name, version, cpe_results
+        )
         
-        print(f"✅ Found {len(cves)} relevant CVEs for {service_name} {version}")
+        logger.info("✅ Found %d relevant CVEs for %s %s", len(cves), service_name, version)
 
-        # 🚀 Save to Supabase in batches
+        # 🚀 Save to Supabase (chunked inside the upsert itself)
         if cves:
-            batch_size = 50
-            for i in range(0, len(cves), batch_size):
-                batch = cves[i:i + batch_size]
-                save_cves_to_supabase(batch)
+            await save_cves_to_supabase(cves)
         
-        # Cache results
-        _cve_cache[cache_key] = (cves, time.time())
+        # Cache results (but never cache an outage as "no CVEs"); a partial lookup is
+        # only kept briefly in memory, and only a lookup where every query answered
+        # goes to disk, where it would outlive a restart
+        if not lookup_failed:
+            _cache_set(cache_key, cves, complete=not lookup_partial)
+        if not lookup_partial:
+            await asyncio.to_thread(
+                nvd_cache.store_response, disk_key, cves, _cache_ttl if cves else _cache_negative_ttl
+            )
         
         return cves
         
-    except requests.exceptions.Timeout:
-        print(f"⏰ Timeout fetching CVEs for {service_name}")
+    except httpx.TimeoutException:
+        logger.warning("⏰ Timeout fetching CVEs for %s", service_name)
         return []  # Return empty list instead of error object
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Network error fetching CVEs for {service_name}: {e}")
+    except httpx.HTTPError as e:
+        logger.warning("❌ Network error fetching CVEs for %s: %s", service_name, e)
         return []  # Return empty list instead of error object
     except Exception as e:
-        print(f"❌ Unexpected error fetching CVEs for {service_name}: {e}")
-        traceback.print_exc()
+        logger.exception("❌ Unexpected error fetching CVEs for %s: %s", service_name, e)
         return []  # Return empty list instead of error object
@@ -3,16 +3,89 @@ HTTP Service Inspector
 Actively probes HTTP/HTTPS services to gather evidence for accurate CVE matching.
 """
 
-import requests
+import asyncio
+import httpx
+import logging
 import ssl
 import socket
 import re
 from typing import Dict, Any, Optional, Tuple
 from urllib.parse import urlparse
 
+logger = logging.getLogger(__name__)
+
 # Timeout for HTTP requests
 HTTP_TIMEOUT = 5
 
+# Connect fails fast on dead hosts; responsive ones still get the full read timeout
+HTTP_CONNECT_TIMEOUT = 2
+
+# Shared client for all HTTP evidence probes (also used by service_probe) so
+# the HEAD/GET requests against one target reuse a single keep-alive connection.
+# Probes are small request/response exchanges, so Nagle's algorithm is disabled.
+http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, write=HTTP_CONNECT_TIMEOUT),
+    verify=False,
+    transport=httpx.AsyncHTTPTransport(
+        verify=False,
+        socket_options=[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)],
+    ),
+)
+
+async def close_http_client() -> None:
+    """
+    Close the shared probe client and its pooled connections (called on app shutdown).
+    """
+    await http_client.aclose()
+
+def headers_to_dict(headers: httpx.Headers) -> Dict[str, str]:
+    """
+    Convert response headers to a plain dict keeping the names as the server sent
+    them (dict(headers) would lower-case every name).
+    Repeated headers are joined with ", ".
+    """
+    result = {}
+    for raw_name, raw_value in headers.raw:
+        name, value = raw_name.decode(headers.encoding), raw_value.decode(headers.encoding)
+        result[name] = f"{result[name]}, {value}" if name in result else value
+    return result
+
+# Server header tokens -> human-readable product names, kept for display AND NVD keyword searches
+_PRODUCT_MAP = {
+    "apache": "Apache httpd",
+    "httpd": "Apache httpd",
+    "microsoft-iis": "Microsoft IIS",
+    "iis": "Microsoft IIS",
+    "nginx": "nginx",
+    "lighttpd": "lighttpd",
+    "tomcat": "Apache Tomcat",
+    "jetty": "Eclipse Jetty",
+}
+
+# Server header pattern: product/version (additional info)
+_SERVER_RE = re.compile(r'^([a-zA-Z0-9_-]+)(?:/([0-9.]+))?')
+
+# CPE vendor:product pairs for the product names parse_server_header reports
+_PRODUCT_CPES = {
+    "Apache httpd": "apache:http_server",
+    "Microsoft IIS": "microsoft:internet_information_services",
+    "nginx": "nginx:nginx",
+    "lighttpd": "lighttpd:lighttpd",
+    "Apache Tomcat": "apache:tomcat",
+    "Eclipse Jetty": "eclipse:jetty",
+}
+
+def product_cpe(product: Optional[str], version: Optional[str]) -> Optional[str]:
+    """
+    Build an nmap-style CPE (cpe:/a:vendor:product:version) for an HTTP-detected
+    product, so the CVE lookup can also let NVD match it server-side.
+    Returns None for products without a known CPE or without a version.
+    """
+    vendor_product = _PRODUCT_CPES.get(product)
+    if not vendor_product or not version:
+        return None
+    return f"cpe:/a:{vendor_product}:{version}"
+
 def parse_server_header(server_header: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Parse Server header into product and version.
@@ -29,35 +102,22 @@ def parse_server_header(server_header: str) -> Tuple[Optional[str], Optional[str
     if not server_header:
         return None, None
     
-    # Keep human-readable product names for display AND NVD keyword searches
-    product_map = {
-        "apache": "Apache httpd",
-        "httpd": "Apache httpd",
-        "microsoft-iis": "Microsoft IIS",
-        "iis": "Microsoft IIS",
-        "nginx": "nginx",
-        "lighttpd": "lighttpd",
-        "tomcat": "Apache Tomcat",
-        "jetty": "Eclipse Jetty",
-    }
-    
     # Try to match product/version pattern
-    # Pattern: product/version (additional info)
-    match = re.match(r'^([a-zA-Z0-9_-]+)(?:/([0-9.]+))?', server_header.strip())
+    match = _SERVER_RE.match(server_header.strip())
     
     if match:
         product = match.group(1).lower()
         version = match.group(2)
         
         # Normalize product name
-        product = product_map.get(product, product)
+        product = _PRODUCT_MAP.get(product, product)
         
         return product, version
     
     return None, None
 
 
-def get_http_headers(hostname: str, ip: Optional[str] = None, port: int = 80) -> Dict[str, Any]:
+async def get_http_headers(hostname: str, ip: Optional[str] = None, port: int = 80) -> Dict[str, Any]:
     """
     Send HTTP request to gather server information.
     Uses Host header to ensure proper virtual host routing.
@@ -87,40 +147,36 @@ def get_http_headers(hostname: str, ip: Optional[str] = None, port: int = 80) ->
         # Set Host header to the actual hostname
         headers = {"Host": hostname}
         
-        print(f"🌐 Probing HTTP service: {url} (Host: {hostname})")
+        logger.debug("🌐 Probing HTTP service: %s (Host: %s)", url, hostname)
         
-        response = requests.get(
-            url,
-            headers=headers,
-            timeout=HTTP_TIMEOUT,
-            allow_redirects=False,
-            verify=False
-        )
+        # Only the headers matter here, so the body is never downloaded
+        async with http_client.stream("GET", url, headers=headers, follow_redirects=False) as response:
+            pass
         
         result["success"] = True
         result["server"] = response.headers.get("Server")
-        result["headers"] = dict(response.headers)
+        result["headers"] = headers_to_dict(response.headers)
         
         # Check for HTTPS redirect
         location = response.headers.get("Location", "")
         if location.startswith("https://"):
             result["redirect_to_https"] = True
-            print(f"✅ HTTP redirects to HTTPS: {location}")
+            logger.info("✅ HTTP redirects to HTTPS: %s", location)
         
         if result["server"]:
-            print(f"✅ Server header detected: {result['server']}")
+            logger.info("✅ Server header detected: %s", result['server'])
         else:
-            print(f"⚠️ No Server header present")
+            logger.info("⚠️ No Server header present")
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         result["error"] = "timeout"
-        print(f"⏰ HTTP request timeout for {hostname}")
-    except requests.exceptions.RequestException as e:
+        logger.warning("⏰ HTTP request timeout for %s", hostname)
+    except httpx.HTTPError as e:
         result["error"] = str(e)
-        print(f"❌ HTTP request failed for {hostname}: {e}")
+        logger.warning("❌ HTTP request failed for %s: %s", hostname, e)
     except Exception as e:
         result["error"] = f"unexpected: {e}"
-        print(f"❌ Unexpected error probing {hostname}: {e}")
+        logger.exception("❌ Unexpected error probing %s: %s", hostname, e)
     
     return result
 
@@ -153,7 +209,7 @@ def get_tls_info(hostname: str, port: int = 443) -> Dict[str, Any]:
     }
     
     try:
-        print(f"🔒 Inspecting TLS service: {hostname}:{port}")
+        logger.debug("🔒 Inspecting TLS service: %s:%s", hostname, port)
         
         context = ssl.create_default_context()
         context.check_hostname = False
@@ -175,25 +231,25 @@ def get_tls_info(hostname: str, port: int = 443) -> Dict[str, Any]:
                     # Note: This is a basic check, ssl context already validates
                     result["cert_expired"] = False
                 
-                print(f"✅ TLS connection successful: {result['protocol']} with {result['cipher']}")
+                logger.info("✅ TLS connection successful: %s with %s", result['protocol'], result['cipher'])
                 
     except ssl.SSLError as e:
         result["error"] = f"ssl_error: {e}"
         if "certificate verify failed" in str(e):
             result["cert_valid"] = False
             result["cert_expired"] = "expired" in str(e).lower()
-        print(f"❌ TLS error for {hostname}: {e}")
+        logger.warning("❌ TLS error for %s: %s", hostname, e)
     except socket.timeout:
         result["error"] = "timeout"
-        print(f"⏰ TLS connection timeout for {hostname}")
+        logger.warning("⏰ TLS connection timeout for %s", hostname)
     except Exception as e:
         result["error"] = str(e)
-        print(f"❌ Unexpected TLS error for {hostname}: {e}")
+        logger.exception("❌ Unexpected TLS error for %s: %s", hostname, e)
     
     return result
 
 
-def inspect_http_service(hostname: str, ip: str, port: int) -> Dict[str, Any]:
+async def inspect_http_service(hostname: str, ip: str, port: int) -> Dict[str, Any]:
     """
     Comprehensive HTTP/HTTPS service inspection.
     
@@ -216,7 +272,7 @@ def inspect_http_service(hostname: str, ip: str, port: int) -> Dict[str, Any]:
     }
     
     # Probe HTTP service
-    http_result = get_http_headers(hostname, ip, port)
+    http_result = await get_http_headers(hostname, ip, port)
     
     if http_result["success"]:
         evidence["http_headers"] = http_result["headers"]
@@ -243,7 +299,8 @@ def inspect_http_service(hostname: str, ip: str, port: int) -> Dict[str, Any]:
     
     # If HTTPS port or redirect detected, inspect TLS
     if port == 443 or evidence["redirect_to_https"]:
-        tls_result = get_tls_info(hostname, 443)
+        # Blocking socket handshake - keep it off the event loop
+        tls_result = await asyncio.to_thread(get_tls_info, hostname, 443)
         evidence["tls_info"] = tls_result
         
         if tls_result["success"]:
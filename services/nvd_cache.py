@@ -0,0 +1,86 @@
+"""
+SQLite-backed cache for NVD lookups: raw API responses and the scored CVE
+lists built from them, under distinct key prefixes.
+Entries survive process restarts, so repeated searches after a redeploy are
+answered from local disk instead of paying NVD's rate-limit spacing again.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Location of the cache database (":memory:" keeps it per-process)
+NVD_CACHE_PATH = os.getenv("NVD_CACHE_PATH", "nvd_cache.sqlite")
+
+# NVD search results are safe to reuse for an hour
+NVD_CACHE_TTL = 3600
+
+# One connection shared by the worker threads that call into this module
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_disabled = False
+
+def _connection() -> Optional[sqlite3.Connection]:
+    """
+    Open the cache database on first use.
+    A path that cannot be opened disables the cache instead of failing lookups.
+    """
+    global _conn, _disabled
+    if _conn is None and not _disabled:
+        try:
+            conn = sqlite3.connect(NVD_CACHE_PATH, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS nvd_responses ("
+                "key TEXT PRIMARY KEY, body BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.commit()
+            _conn = conn
+        except sqlite3.Error as e:
+            logger.warning("⚠️ NVD disk cache unavailable at %s - %s", NVD_CACHE_PATH, e)
+            _disabled = True
+    return _conn
+
+def load_response(key: str) -> Optional[Any]:
+    """
+    Return the cached response for key, or None when missing or expired.
+    Blocking; call through asyncio.to_thread from async code.
+    """
+    with _lock:
+        conn = _connection()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT body FROM nvd_responses WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ NVD disk cache read failed - %s", e)
+            return None
+    return orjson.loads(row[0]) if row else None
+
+def store_response(key: str, value: Any, ttl: float = NVD_CACHE_TTL) -> None:
+    """
+    Store a response for key, replacing any previous entry.
+    Blocking; call through asyncio.to_thread from async code.
+    """
+    body = orjson.dumps(value)
+    with _lock:
+        conn = _connection()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO nvd_responses (key, body, expires_at) VALUES (?, ?, ?)",
+                    (key, body, time.time() + ttl)
+                )
+        except sqlite3.Error as e:
+            logger.warning("⚠️ NVD disk cache write failed - %s", e)
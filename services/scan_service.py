@@ -11,17 +11,22 @@ Gating Logic:
 """
 
 import nmap
-import traceback
+import asyncio
+import logging
 from fastapi import HTTPException
 from services.cve_service import fetch_cves_for_service
 from services.service_probe import probe_http_service, probe_banner, merge_detection_results
-from services.http_inspector import inspect_http_service, parse_server_header
-from typing import List, Dict, Any, Optional
+from services.http_inspector import inspect_http_service, parse_server_header, product_cpe
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+import os
 import re
+import shlex
 import socket
 import subprocess
 import ipaddress
 
+logger = logging.getLogger(__name__)
+
 # Optional mapping of profiles to NSE scripts for deeper detection
 PROFILE_EXTRA_SCRIPTS = {
     "web-apps": "http-enum,http-headers,http-title,ssl-cert,banner",
@@ -30,14 +35,24 @@ PROFILE_EXTRA_SCRIPTS = {
     "comprehensive": "http-enum,http-headers,http-title,ssl-cert,banner,ssh-hostkey,default,safe"
 }
 
+# Maximum number of nmap processes allowed to run at the same time
+MAX_CONCURRENT_SCANS = 4
+
+# nmap runs as an asyncio subprocess; this bounds how many run at once
+_NMAP_SLOTS = asyncio.Semaphore(MAX_CONCURRENT_SCANS)
+
+# RFC1918 prefixes folded into a single precompiled alternation
+_PRIVATE_CIDR_RE = re.compile(r'^(?:10\.|192\.168\.|172\.(?:1[6-9]|2[0-9]|3[0-1])\.)')
+
+# Ports that get HTTP verification (header inspection + probe) on top of nmap detection
+HTTP_PORTS = frozenset({80, 443, 8000, 8080, 8443, 3000, 5000, 9000})
+
+# nmap stderr lines python-nmap files under warnings rather than errors (its own pattern)
+_NMAP_WARNING_RE = re.compile('^Warning: .*', re.IGNORECASE)
+
 def is_private_cidr(target: str) -> bool:
     """Detect RFC1918 private IP addresses"""
-    private_patterns = [
-        r'^10\.',
-        r'^192\.168\.',
-        r'^172\.(1[6-9]|2[0-9]|3[0-1])\.'
-    ]
-    return any(re.match(pattern, target) for pattern in private_patterns)
+    return _PRIVATE_CIDR_RE.match(target) is not None
 
 def backend_has_raw_socket() -> bool:
     """Check if nmap has raw socket capabilities"""
@@ -68,10 +83,377 @@ def backend_on_subnet(target: str) -> bool:
 def build_lan_aware_nmap_args(target: str, base_args: str, scan_profile: str) -> str:
     """Build nmap args - pass through arguments from frontend"""
     # Simply return the args as-is to preserve all flags and options
-    print(f"✓ Using nmap arguments for {target}: {base_args}")
+    logger.debug("✓ Using nmap arguments for %s: %s", target, base_args)
     return base_args
 
-def perform_network_scan(ip_address: str, nmap_args: str, scan_profile: str, follow_up: bool = False) -> Dict[str, Any]:
+def _extract_host_info(host: str, host_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract host metadata (OS detection, MAC, latency, hostnames) from nmap host data.
+    """
+    host_info = {}
+    logger.debug("🖥️  Extracting host information for %s...", host)
+    
+    # OS Detection
+    os_matches = host_data.get('osmatch', [])
+    if os_matches:
+        host_info['os_matches'] = [
+            {
+                'name': match.get('name', 'Unknown'),
+                'accuracy': match.get('accuracy', 0),
+                'os_class': match.get('osclass', [])
+            }
+            for match in os_matches[:3]  # Top 3 matches
+        ]
+        logger.info("🎯 OS Detection: %s (%s%% accuracy)", os_matches[0].get('name'), os_matches[0].get('accuracy'))
+
+    # MAC Address
+    addresses = host_data.get('addresses', {})
+    if 'mac' in addresses:
+        host_info['mac_address'] = addresses['mac']
+        vendor = host_data.get('vendor', {}).get(addresses['mac'], 'Unknown')
+        host_info['mac_vendor'] = vendor
+        logger.info("📡 MAC Address: %s (%s)", addresses['mac'], vendor)
+
+    # Host state and latency
+    if 'status' in host_data:
+        host_info['state'] = host_data['status'].get('state', 'unknown')
+        host_info['reason'] = host_data['status'].get('reason', 'unknown')
+
+    # Uptime (if available)
+    if 'uptime' in host_data:
+        host_info['uptime'] = {
+            'seconds': host_data['uptime'].get('seconds', 0),
+            'lastboot': host_data['uptime'].get('lastboot', '')
+        }
+
+    # Distance (network hops)
+    if 'distance' in host_data:
+        host_info['distance'] = host_data['distance']
+        logger.debug("🌐 Network distance: %s hops", host_data['distance'])
+
+    # Hostname
+    hostnames = host_data.get('hostnames', [])
+    if hostnames:
+        host_info['hostnames'] = [h.get('name', '') for h in hostnames if h.get('name')]
+        logger.debug("🏷️  Hostname: %s", ', '.join(host_info['hostnames']))
+    
+    return host_info
+
+def _iter_tcp_ports(nm: "nmap.PortScanner", hosts_list: List[str]):
+    """
+    Yield (host, port, port_info) for every TCP port nmap reported (open, filtered, closed).
+    """
+    for host in hosts_list:
+        host_data = nm[host]
+        if 'tcp' not in host_data or not host_data['tcp']:
+            logger.info("ℹ️  No TCP port data found for %s", host)
+            continue
+        
+        tcp_ports = host_data['tcp']
+        logger.info("🔓 Host %s: Found %d TCP ports with states: %s", host, len(tcp_ports), list(tcp_ports.keys()))
+        
+        for port, port_info in tcp_ports.items():
+            yield host, port, port_info
+
+async def _analyze_port(host: str, port: int, port_info: Dict[str, Any], host_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the result entry for a single port: HTTP verification plus gated CVE enrichment.
+    """
+    # DEBUG: Print raw port_info to see exactly what nmap returns
+    logger.debug("🔍 DEBUG RAW port_info for port %s: %s", port, port_info)
+    
+    port_state = port_info.get('state', 'unknown')
+    service_name = port_info.get('name', 'unknown')
+    product = port_info.get('product', '').strip()
+    version_str = port_info.get('version', '').strip()
+    display_version = " ".join(part for part in (product, version_str) if part) or "unknown"
+
+    # Decide what to search in CVE DB
+    search_service_name = product or service_name
+    search_version = version_str or "unknown"
+    # nmap's CPE only describes its own product/version guess
+    search_cpe = port_info.get('cpe') or None
+
+    # DEBUG: Explicit state verification
+    logger.debug("✅ Port %s STATE='%s' | Service=%s | Version=%s", port, port_state, service_name, display_version)
+
+    # Enhanced service detection for HTTP/HTTPS services with gated CVE lookup
+    probe_data = {}
+    evidence = {}
+    final_product = None
+    final_version = None
+    status = "info"
+    recommendations = []
+
+    # Initialize service_data for ALL ports (not just HTTP)
+    service_data = {
+        "host": host,
+        "port": port,
+        "state": port_state,
+        "service": service_name,
+        "version": display_version,
+        "cves": [],
+        "confidence": 50.0,
+        "raw_banner": "",
+        "headers": {},
+        "tls_info": {},
+        "proxy_detection": {},
+        "detection_methods": {"sources": ["nmap"]},
+        "status": status,
+        "recommendations": []
+    }
+
+    if port_state == "open" and port in HTTP_PORTS:
+        logger.debug("🔬 Performing HTTP verification on %s:%s...", host, port)
+
+        # Determine hostname for proper Host header
+        hostname = host
+        if 'hostnames' in host_info and host_info['hostnames']:
+            hostname = host_info['hostnames'][0]
+
+        # Inspect HTTP service and run the legacy probe for additional data concurrently
+        evidence, probe_data = await asyncio.gather(
+            inspect_http_service(hostname, host, port),
+            probe_http_service(host, port)
+        )
+
+        # Decision logic for product/version
+        if evidence.get('product') and evidence.get('version'):
+            # HIGH CONFIDENCE: Product + Version from HTTP headers
+            final_product = evidence['product']
+            final_version = evidence['version']
+            search_service_name = final_product
+            search_version = final_version
+            search_cpe = product_cpe(final_product, final_version)
+            display_version = f"{final_product} {final_version}"
+            status = "vulnerable"  # Will be updated after CVE check
+            logger.info("✅ HIGH CONFIDENCE: %s %s (from HTTP headers)", final_product, final_version)
+
+        elif evidence.get('product') and not evidence.get('version'):
+            # MEDIUM CONFIDENCE: Product only, no version
+            final_product = evidence['product']
+            final_version = None
+            search_cpe = None
+            # Check if nmap had version info
+            if version_str and version_str.lower() != "unknown":
+                final_version = version_str
+                search_service_name = final_product
+                search_version = final_version
+                search_cpe = product_cpe(final_product, final_version)
+                display_version = f"{final_product} {final_version} (nmap)"
+                status = "vulnerable"
+                logger.info("✅ MEDIUM→HIGH: %s %s (product from headers, version from nmap)", final_product, final_version)
+            else:
+                search_service_name = final_product
+                search_version = None  # Will gate CVE lookup
+                display_version = f"{final_product} (version unknown)"
+                status = "unconfirmed"
+                recommendations.append(
+                    "Server header lacks version. CVE lookup skipped to avoid false positives. "
+                    "Consider authenticated scan or manual verification."
+                )
+                logger.warning("⚠️ MEDIUM CONFIDENCE: %s but no version - CVE lookup will be skipped", final_product)
+
+        elif product and version_str:
+            # Fallback to nmap detection
+            final_product = product
+            final_version = version_str
+            search_service_name = final_product
+            search_version = final_version
+            display_version = f"{product} {version_str}"
+            status = "vulnerable"
+            logger.info("✅ Using nmap detection: %s %s", product, version_str)
+
+        else:
+            # NO PRODUCT/VERSION DETECTED
+            search_service_name = service_name
+            search_version = None  # Will gate CVE lookup
+            display_version = "unknown"
+            status = "info"
+            recommendations.append(
+                "Service detected but product/version could not be determined. "
+                "CVE lookup skipped to prevent false positives."
+            )
+            logger.warning("⚠️ LOW CONFIDENCE: No product/version detected - CVE lookup will be skipped")
+
+        # Add evidence-based recommendations
+        if evidence.get('recommendations'):
+            recommendations.extend(evidence['recommendations'])
+
+        # Merge probe data for additional context
+        if probe_data:
+            merged = merge_detection_results(service_name, display_version, probe_data)
+            if merged.get('conflicts'):
+                logger.warning("⚠️ Conflicts detected: %s", merged['conflicts'])
+
+        logger.info("📋 Final detection: product=%s, version=%s, status=%s", final_product, final_version, status)
+
+        # Build detection methods list
+        detection_methods = probe_data.get('detection_methods', ['nmap']) if probe_data else ['nmap']
+        if evidence:
+            if evidence.get('evidence_sources'):
+                detection_methods.extend(evidence['evidence_sources'])
+
+        # Build evidence dict for storage
+        evidence_data = {
+            "sources": list(set(detection_methods)),
+            "http_headers": evidence.get('http_headers', {}),
+            "tls_info": evidence.get('tls_info', {}),
+            "redirect_to_https": evidence.get('redirect_to_https', False),
+            "confidence_level": evidence.get('confidence', 'low'),
+            "recommendations": recommendations
+        }
+
+        # Update service_data with HTTP-specific info
+        service_data.update({
+            "version": display_version,
+            "confidence": probe_data.get('confidence', 50.0) if probe_data else 50.0,
+            "raw_banner": probe_data.get('raw_banner', ''),
+            "headers": evidence.get('http_headers', probe_data.get('headers', {})),
+            "tls_info": evidence.get('tls_info', probe_data.get('tls_info', {})),
+            "proxy_detection": probe_data.get('proxy_detection', {}),
+            "detection_methods": evidence_data,
+            "status": status,
+            "recommendations": recommendations
+        })
+
+    # GATED CVE ENRICHMENT
+    # Only fetch CVEs when we have high confidence (product + version)
+    if port_state == "open" and search_service_name.lower() != "unknown":
+        # Check if we have version info (gating condition)
+        has_version = search_version and search_version.lower() != "unknown"
+
+        if has_version:
+            # HIGH CONFIDENCE: Fetch CVEs
+            try:
+                logger.info("🔓 GATED CVE LOOKUP: Fetching CVEs for %s %s", search_service_name, search_version)
+                cves = await fetch_cves_for_service(
+                    search_service_name, search_version, require_version=True, cpe=search_cpe
+                )
+                service_data["cves"] = cves
+
+                if cves:
+                    # Check if any high-severity CVEs
+                    high_severity = any(cve.get('cvss', 0) and cve['cvss'] >= 7.0 for cve in cves)
+                    service_data["status"] = "vulnerable" if high_severity else "low_risk"
+                    logger.info("📄 Found %d CVEs for %s %s", len(cves), search_service_name, search_version)
+                else:
+                    service_data["status"] = "no_cves_found"
+                    logger.info("✅ No CVEs found for %s %s", search_service_name, search_version)
+            except Exception as e:
+                logger.exception("⚠️ Error fetching CVEs for %s: %s", search_service_name, e)
+                service_data["cves"] = [{"error": f"Could not fetch CVEs: {e}"}]
+        else:
+            # NO VERSION: Skip CVE lookup to avoid false positives
+            logger.info("🚫 GATED CVE LOOKUP: Skipping %s - no version (avoiding false positives)", search_service_name)
+            service_data["cves"] = []
+            service_data["status"] = "unconfirmed"
+            if "Server detected but version unknown" not in str(service_data.get("recommendations", [])):
+                service_data["recommendations"].append(
+                    f"Product '{search_service_name}' detected but version unknown. "
+                    "CVE lookup skipped to prevent false positives. "
+                    "Run authenticated scan or check server configuration for precise version."
+                )
+    
+    return service_data
+
+async def _run_nmap_scan(ip_address: str, nmap_args: str, scan_profile: str, follow_up: bool) -> Tuple["nmap.PortScanner", str]:
+    """
+    Run nmap against the target and return the populated scanner and the executed command.
+    """
+    # PortScanner() locates the nmap binary by running `nmap -V`, which blocks
+    nm = await asyncio.to_thread(nmap.PortScanner)
+    
+    # Apply LAN-aware optimizations
+    if not follow_up:
+        nmap_args = build_lan_aware_nmap_args(ip_address, nmap_args, scan_profile)
+    
+    # For follow-up scans, add profile-specific scripts
+    if follow_up and scan_profile in PROFILE_EXTRA_SCRIPTS:
+        extra_scripts = PROFILE_EXTRA_SCRIPTS[scan_profile]
+        if '--script' not in nmap_args:
+            nmap_args += f" --script {extra_scripts}"
+        logger.info("📝 Follow-up scan using scripts: %s", extra_scripts)
+    
+    # Pass target directly to nmap - it handles CIDR, ranges, and single hosts natively
+    hosts_arg = ip_address.strip()
+
+    # Build full command for logging
+    full_command = f"nmap {nmap_args} {hosts_arg}"
+    logger.info("🚀 Executing: %s", full_command)
+
+    # Execute the scan across all expanded hosts
+    async with _NMAP_SLOTS:
+        try:
+            xml_output, nmap_err = await _exec_nmap(nm, hosts_arg, nmap_args)
+        except NotImplementedError:
+            # Selector event loops (Windows under uvicorn reload) cannot spawn
+            # subprocesses; let python-nmap run and parse the scan in a worker thread
+            logger.info("🧵 Event loop lacks subprocess support - running nmap in a thread")
+            await asyncio.to_thread(nm.scan, hosts=hosts_arg, arguments=nmap_args)
+            return nm, full_command
+    
+    # Split stderr into warnings and errors with python-nmap's warning pattern;
+    # unlike its scan(), each error line is kept on its own instead of all of stderr
+    nmap_err_keep_trace = []
+    nmap_warn_keep_trace = []
+    for line in nmap_err.splitlines():
+        if _NMAP_WARNING_RE.search(line):
+            nmap_warn_keep_trace.append(line + os.linesep)
+        elif line:
+            nmap_err_keep_trace.append(line + os.linesep)
+    
+    nm.analyse_nmap_xml_scan(
+        nmap_xml_output=xml_output,
+        nmap_err=nmap_err,
+        nmap_err_keep_trace=nmap_err_keep_trace,
+        nmap_warn_keep_trace=nmap_warn_keep_trace
+    )
+    
+    return nm, full_command
+
+async def _exec_nmap(nm: "nmap.PortScanner", hosts_arg: str, nmap_args: str) -> Tuple[str, str]:
+    """
+    Run nmap with XML output on stdout as an asyncio subprocess.
+    
+    Returns:
+        (xml_output, stderr) decoded as text
+    """
+    proc = await asyncio.create_subprocess_exec(
+        getattr(nm, "_nmap_path", "nmap"), "-oX", "-", hosts_arg, *shlex.split(nmap_args),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        # Request went away - don't leave an orphaned nmap behind
+        proc.kill()
+        await proc.wait()
+        raise
+    
+    return stdout.decode("utf-8", errors="replace"), stderr.decode("utf-8", errors="replace")
+
+def _scan_error_result(ip_address: str, nmap_args: str, error: Exception) -> Dict[str, Any]:
+    """Build the response returned when nmap itself fails."""
+    return {
+        "results": [],
+        "nmap_cmd": f"nmap {nmap_args} {ip_address}",
+        "nmap_output": f"Error: {str(error)}",
+        "error": str(error),
+        "host_info": None
+    }
+
+def _no_hosts_result(ip_address: str, full_command: str) -> Dict[str, Any]:
+    """Build the response returned when nmap finds no hosts."""
+    return {
+        "results": [],
+        "nmap_cmd": full_command,
+        "nmap_output": "No hosts found",
+        "error": f"Host {ip_address} not found or not scannable."
+    }
+
+async def perform_network_scan(ip_address: str, nmap_args: str, scan_profile: str, follow_up: bool = False) -> Dict[str, Any]:
     """
     Perform network scan on the given IP address using nmap.
     
@@ -84,301 +466,31 @@ def perform_network_scan(ip_address: str, nmap_args: str, scan_profile: str, fol
     Returns:
         Dictionary containing scan results with CVE information, OS detection, and command used
     """
-    print(f"🔍 Starting {'follow-up ' if follow_up else ''}scan on {ip_address} with args: {nmap_args}")
+    logger.info("🔍 Starting %sscan on %s with args: %s", 'follow-up ' if follow_up else '', ip_address, nmap_args)
     
     try:
-        nm = nmap.PortScanner()
-        results = []
-        host_info = {}
-        
-        # Apply LAN-aware optimizations
-        if not follow_up:
-            nmap_args = build_lan_aware_nmap_args(ip_address, nmap_args, scan_profile)
-        
-        # For follow-up scans, add profile-specific scripts
-        if follow_up and scan_profile in PROFILE_EXTRA_SCRIPTS:
-            extra_scripts = PROFILE_EXTRA_SCRIPTS[scan_profile]
-            if '--script' not in nmap_args:
-                nmap_args += f" --script {extra_scripts}"
-            print(f"📝 Follow-up scan using scripts: {extra_scripts}")
-        
-        # Pass target directly to nmap - it handles CIDR, ranges, and single hosts natively
-        hosts_arg = ip_address.strip()
-
-        # Build full command for logging
-        full_command = f"nmap {nmap_args} {hosts_arg}"
-        print(f"🚀 Executing: {full_command}")
-
-        # Execute the scan across all expanded hosts
-        nm.scan(hosts=hosts_arg, arguments=nmap_args)
+        nm, full_command = await _run_nmap_scan(ip_address, nmap_args, scan_profile, follow_up)
         
         hosts_list = nm.all_hosts()
         if not hosts_list:
-            return {
-                "results": [],
-                "nmap_cmd": full_command,
-                "nmap_output": "No hosts found",
-                "error": f"Host {ip_address} not found or not scannable."
-            }
+            return _no_hosts_result(ip_address, full_command)
         
-        print(f"🌐 Found {len(hosts_list)} host(s) in scan")
+        logger.info("🌐 Found %d host(s) in scan", len(hosts_list))
         
-        # Process ALL hosts from the scan (important for subnet scans)
-        for host in hosts_list:
-            host_data = nm[host]
-            
-            # Extract host metadata (OS detection, MAC, latency, etc.) for first host only
-            if not follow_up and host == hosts_list[0]:
-                print(f"🖥️  Extracting host information for {host}...")
-                
-                # OS Detection
-                os_matches = host_data.get('osmatch', [])
-                if os_matches:
-                    host_info['os_matches'] = [
-                        {
-                            'name': match.get('name', 'Unknown'),
-                            'accuracy': match.get('accuracy', 0),
-                            'os_class': match.get('osclass', [])
-                        }
-                        for match in os_matches[:3]  # Top 3 matches
-                    ]
-                    print(f"🎯 OS Detection: {os_matches[0].get('name')} ({os_matches[0].get('accuracy')}% accuracy)")
-                
-                # MAC Address
-                addresses = host_data.get('addresses', {})
-                if 'mac' in addresses:
-                    host_info['mac_address'] = addresses['mac']
-                    vendor = host_data.get('vendor', {}).get(addresses['mac'], 'Unknown')
-                    host_info['mac_vendor'] = vendor
-                    print(f"📡 MAC Address: {addresses['mac']} ({vendor})")
-                
-                # Host state and latency
-                if 'status' in host_data:
-                    host_info['state'] = host_data['status'].get('state', 'unknown')
-                    host_info['reason'] = host_data['status'].get('reason', 'unknown')
-                
-                # Uptime (if available)
-                if 'uptime' in host_data:
-                    host_info['uptime'] = {
-                        'seconds': host_data['uptime'].get('seconds', 0),
-                        'lastboot': host_data['uptime'].get('lastboot', '')
-                    }
-                
-                # Distance (network hops)
-                if 'distance' in host_data:
-                    host_info['distance'] = host_data['distance']
-                    print(f"🌐 Network distance: {host_data['distance']} hops")
-                
-                # Hostname
-                hostnames = host_data.get('hostnames', [])
-                if hostnames:
-                    host_info['hostnames'] = [h.get('name', '') for h in hostnames if h.get('name')]
-                    print(f"🏷️  Hostname: {', '.join(host_info['hostnames'])}")
-
-            # Process ALL TCP ports (open, filtered, closed)
-            if 'tcp' not in host_data or not host_data['tcp']:
-                print(f"ℹ️  No TCP port data found for {host}")
-                continue
-            
-            tcp_ports = host_data['tcp']
-            print(f"🔓 Host {host}: Found {len(tcp_ports)} TCP ports with states: {list(tcp_ports.keys())}")
-
-            for port, port_info in tcp_ports.items():
-                # DEBUG: Print raw port_info to see exactly what nmap returns
-                print(f"🔍 DEBUG RAW port_info for port {port}: {port_info}")
-                
-                port_state = port_info.get('state', 'unknown')
-                service_name = port_info.get('name', 'unknown')
-                product = port_info.get('product', '').strip()
-                version_str = port_info.get('version', '').strip()
-                display_version = f"{product} {version_str}".strip() or "unknown"
-
-                # Decide what to search in CVE DB
-                search_service_name = product or service_name
-                search_version = version_str or "unknown"
-
-                # DEBUG: Explicit state verification
-                print(f"✅ Port {port} STATE='{port_state}' | Service={service_name} | Version={display_version}")
-
-                # Enhanced service detection for HTTP/HTTPS services with gated CVE lookup
-                probe_data = {}
-                evidence = {}
-                final_product = None
-                final_version = None
-                status = "info"
-                recommendations = []
-                
-                # Initialize service_data for ALL ports (not just HTTP)
-                service_data = {
-                    "host": host,
-                    "port": port,
-                    "state": port_state,
-                    "service": service_name,
-                    "version": display_version,
-                    "cves": [],
-                    "confidence": 50.0,
-                    "raw_banner": "",
-                    "headers": {},
-                    "tls_info": {},
-                    "proxy_detection": {},
-                    "detection_methods": {"sources": ["nmap"]},
-                    "status": status,
-                    "recommendations": []
-                }
-                
-                if port_state == "open" and port in [80, 443, 8000, 8080, 8443, 3000, 5000, 9000]:
-                    print(f"🔬 Performing HTTP verification on {host}:{port}...")
-                    
-                    # Determine hostname for proper Host header
-                    hostname = host
-                    if 'hostnames' in host_info and host_info['hostnames']:
-                        hostname = host_info['hostnames'][0]
-                    
-                    # Inspect HTTP service
-                    evidence = inspect_http_service(hostname, host, port)
-                    
-                    # Also run legacy probe for additional data
-                    probe_data = probe_http_service(host, port)
-                    
-                    # Decision logic for product/version
-                    if evidence.get('product') and evidence.get('version'):
-                        # HIGH CONFIDENCE: Product + Version from HTTP headers
-                        final_product = evidence['product']
-                        final_version = evidence['version']
-                        search_service_name = final_product
-                        search_version = final_version
-                        display_version = f"{final_product} {final_version}"
-                        status = "vulnerable"  # Will be updated after CVE check
-                        print(f"✅ HIGH CONFIDENCE: {final_product} {final_version} (from HTTP headers)")
-                        
-                    elif evidence.get('product') and not evidence.get('version'):
-                        # MEDIUM CONFIDENCE: Product only, no version
-                        final_product = evidence['product']
-                        final_version = None
-                        # Check if nmap had version info
-                        if version_str and version_str.lower() != "unknown":
-                            final_version = version_str
-                            search_service_name = final_product
-                            search_version = final_version
-                            display_version = f"{final_product} {final_version} (nmap)"
-                            status = "vulnerable"
-                            print(f"✅ MEDIUM→HIGH: {final_product} {final_version} (product from headers, version from nmap)")
-                        else:
-                            search_service_name = final_product
-                            search_version = None  # Will gate CVE lookup
-                            display_version = f"{final_product} (version unknown)"
-                            status = "unconfirmed"
-                            recommendations.append(
-                                "Server header lacks version. CVE lookup skipped to avoid false positives. "
-                                "Consider authenticated scan or manual verification."
-                            )
-                            print(f"⚠️ MEDIUM CONFIDENCE: {final_product} but no version - CVE lookup will be skipped")
-                    
-                    elif product and version_str:
-                        # Fallback to nmap detection
-                        final_product = product
-                        final_version = version_str
-                        search_service_name = final_product
-                        search_version = final_version
-                        display_version = f"{product} {version_str}"
-                        status = "vulnerable"
-                        print(f"✅ Using nmap detection: {product} {version_str}")
-                    
-                    else:
-                        # NO PRODUCT/VERSION DETECTED
-                        search_service_name = service_name
-                        search_version = None  # Will gate CVE lookup
-                        display_version = "unknown"
-                        status = "info"
-                        recommendations.append(
-                            "Service detected but product/version could not be determined. "
-                            "CVE lookup skipped to prevent false positives."
-                        )
-                        print(f"⚠️ LOW CONFIDENCE: No product/version detected - CVE lookup will be skipped")
-                    
-                    # Add evidence-based recommendations
-                    if evidence.get('recommendations'):
-                        recommendations.extend(evidence['recommendations'])
-                    
-                    # Merge probe data for additional context
-                    if probe_data:
-                        merged = merge_detection_results(service_name, display_version, probe_data)
-                        if merged.get('conflicts'):
-                            print(f"⚠️ Conflicts detected: {merged['conflicts']}")
-                    
-                    print(f"📋 Final detection: product={final_product}, version={final_version}, status={status}")
-                    
-                    # Build detection methods list
-                    detection_methods = probe_data.get('detection_methods', ['nmap']) if probe_data else ['nmap']
-                    if evidence:
-                        if evidence.get('evidence_sources'):
-                            detection_methods.extend(evidence['evidence_sources'])
-                    
-                    # Build evidence dict for storage
-                    evidence_data = {
-                        "sources": list(set(detection_methods)),
-                        "http_headers": evidence.get('http_headers', {}),
-                        "tls_info": evidence.get('tls_info', {}),
-                        "redirect_to_https": evidence.get('redirect_to_https', False),
-                        "confidence_level": evidence.get('confidence', 'low'),
-                        "recommendations": recommendations
-                    }
-                    
-                    # Update service_data with HTTP-specific info
-                    service_data.update({
-                        "version": display_version,
-                        "confidence": probe_data.get('confidence', 50.0) if probe_data else 50.0,
-                        "raw_banner": probe_data.get('raw_banner', ''),
-                        "headers": evidence.get('http_headers', probe_data.get('headers', {})),
-                        "tls_info": evidence.get('tls_info', probe_data.get('tls_info', {})),
-                        "proxy_detection": probe_data.get('proxy_detection', {}),
-                        "detection_methods": evidence_data,
-                        "status": status,
-                        "recommendations": recommendations
-                    })
-
-                # GATED CVE ENRICHMENT
-                # Only fetch CVEs when we have high confidence (product + version)
-                if port_state == "open" and search_service_name.lower() != "unknown":
-                    # Check if we have version info (gating condition)
-                    has_version = search_version and search_version.lower() != "unknown"
-                    
-                    if has_version:
-                        # HIGH CONFIDENCE: Fetch CVEs
-                        try:
-                            print(f"🔓 GATED CVE LOOKUP: Fetching CVEs for {search_service_name} {search_version}")
-                            cves = fetch_cves_for_service(search_service_name, search_version, require_version=True)
-                            service_data["cves"] = cves
-                            
-                            if cves:
-                                # Check if any high-severity CVEs
-                                high_severity = any(cve.get('cvss', 0) and cve['cvss'] >= 7.0 for cve in cves)
-                                service_data["status"] = "vulnerable" if high_severity else "low_risk"
-                                print(f"📄 Found {len(cves)} CVEs for {search_service_name} {search_version}")
-                            else:
-                                service_data["status"] = "no_cves_found"
-                                print(f"✅ No CVEs found for {search_service_name} {search_version}")
-                        except Exception as e:
-                            print(f"⚠️ Error fetching CVEs for {search_service_name}: {e}")
-                            traceback.print_exc()
-                            service_data["cves"] = [{"error": f"Could not fetch CVEs: {e}"}]
-                    else:
-                        # NO VERSION: Skip CVE lookup to avoid false positives
-                        print(f"🚫 GATED CVE LOOKUP: Skipping {search_service_name} - no version (avoiding false positives)")
-                        service_data["cves"] = []
-                        service_data["status"] = "unconfirmed"
-                        if "Server detected but version unknown" not in str(service_data.get("recommendations", [])):
-                            service_data["recommendations"].append(
-                                f"Product '{search_service_name}' detected but version unknown. "
-                                "CVE lookup skipped to prevent false positives. "
-                                "Run authenticated scan or check server configuration for precise version."
-                            )
-
-                # Append service_data for ALL ports (moved outside the HTTP block)
-                results.append(service_data)
-
-        print(f"✅ Scan completed successfully")
-        print(f"📊 Found {len(results)} port entries across {len(hosts_list)} host(s)")
+        # Extract host metadata for the first host only
+        host_info = {}
+        if not follow_up:
+            host_info = _extract_host_info(hosts_list[0], nm[hosts_list[0]])
+        
+        # Process ALL hosts from the scan (important for subnet scans); ports are
+        # enriched concurrently so total time tracks the slowest lookup, not the sum
+        results = list(await asyncio.gather(*(
+            _analyze_port(host, port, port_info, host_info)
+            for host, port, port_info in _iter_tcp_ports(nm, hosts_list)
+        )))
+
+        logger.info("✅ Scan completed successfully")
+        logger.info("📊 Found %d port entries across %d host(s)", len(results), len(hosts_list))
         
         # Return results, metadata, and host information
         return {
@@ -389,21 +501,73 @@ def perform_network_scan(ip_address: str, nmap_args: str, scan_profile: str, fol
         }
 
     except nmap.PortScannerError as e:
-        print(f"❌ Nmap scanner error: {e}")
-        return {
-            "results": [],
-            "nmap_cmd": f"nmap {nmap_args} {ip_address}",
-            "nmap_output": f"Error: {str(e)}",
-            "error": str(e),
-            "host_info": None
-        }
+        logger.error("❌ Nmap scanner error: %s", e)
+        return _scan_error_result(ip_address, nmap_args, e)
     except Exception as e:
-        print(f"❌ Unexpected error during scan: {e}")
-        traceback.print_exc()
-        return {
-            "results": [],
-            "nmap_cmd": f"nmap {nmap_args} {ip_address}",
-            "nmap_output": f"Error: {str(e)}",
-            "error": str(e),
-            "host_info": None
-        }
+        logger.exception("❌ Unexpected error during scan: %s", e)
+        return _scan_error_result(ip_address, nmap_args, e)
+
+async def stream_network_scan(
+    ip_address: str,
+    nmap_args: str,
+    scan_profile: str,
+    follow_up: bool = False
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming variant of perform_network_scan.
+    
+    Yields (event, payload) pairs:
+        "scan"    - once nmap finishes: command and host information
+        "service" - one per port entry, as soon as its enrichment completes
+        "done"    - after the last service: raw nmap output and entry count
+        "error"   - instead of the above when nmap fails or finds no hosts, or in
+                    place of "done" when enriching a port fails unexpectedly
+    """
+    logger.info("🔍 Starting streamed %sscan on %s with args: %s", 'follow-up ' if follow_up else '', ip_address, nmap_args)
+    
+    try:
+        nm, full_command = await _run_nmap_scan(ip_address, nmap_args, scan_profile, follow_up)
+    except nmap.PortScannerError as e:
+        logger.error("❌ Nmap scanner error: %s", e)
+        yield "error", _scan_error_result(ip_address, nmap_args, e)
+        return
+    except Exception as e:
+        logger.exception("❌ Unexpected error during scan: %s", e)
+        yield "error", _scan_error_result(ip_address, nmap_args, e)
+        return
+    
+    hosts_list = nm.all_hosts()
+    if not hosts_list:
+        yield "error", _no_hosts_result(ip_address, full_command)
+        return
+    
+    host_info = {}
+    if not follow_up:
+        host_info = _extract_host_info(hosts_list[0], nm[hosts_list[0]])
+    
+    yield "scan", {"nmap_cmd": full_command, "host_info": host_info if host_info else None}
+    
+    tasks = [
+        asyncio.ensure_future(_analyze_port(host, port, port_info, host_info))
+        for host, port, port_info in _iter_tcp_ports(nm, hosts_list)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                service_data = await next_done
+            except Exception as e:
+                # Same outcome as perform_network_scan, so clients can tell a failed
+                # scan from a dropped connection
+                logger.exception("❌ Unexpected error during scan: %s", e)
+                yield "error", _scan_error_result(ip_address, nmap_args, e)
+                return
+            yield "service", service_data
+    finally:
+        # Client went away mid-stream - stop outstanding probes and lookups
+        for task in tasks:
+            task.cancel()
+    
+    yield "done", {
+        "nmap_output": nm.csv() if hasattr(nm, 'csv') else str(nm.all_hosts()),
+        "total": len(tasks)
+    }
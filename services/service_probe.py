@@ -1,11 +1,76 @@
+import asyncio
+import httpx
+import logging
+import re
 import socket
 import ssl
-import requests
-from typing import Dict, Any, List
-import traceback
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 from datetime import datetime
+from services.http_inspector import headers_to_dict, http_client
 
-def probe_http_service(host: str, port: int, use_https: bool = False) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+# Only the start of a response body is kept as the banner; stop downloading there
+BANNER_MAX_BYTES = 2048
+
+
+async def _read_capped_body(response: httpx.Response, limit: int = BANNER_MAX_BYTES) -> str:
+    """
+    Read at most `limit` bytes of a streamed response body and decode them.
+    Large or never-ending bodies are cut off instead of being buffered whole.
+    """
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body += chunk
+        if len(body) >= limit:
+            break
+    return bytes(body[:limit]).decode(response.charset_encoding or "utf-8", errors="replace")
+
+
+# Ports whose scheme is known up front
+_HTTPS_PORTS = frozenset({443, 8443})
+_PLAIN_HTTP_PORTS = frozenset({80})
+
+# (Server header marker, technology name, confidence, marker that shadows it) in
+# detection order; OpenResty reports itself as nginx too, so it suppresses that entry
+_SERVER_TECHNOLOGIES = (
+    ('openresty', 'OpenResty', 95, None),
+    ('nginx', 'nginx', 90, 'openresty'),
+    ('apache', 'Apache', 90, None),
+)
+
+
+async def _head_first_answer(host: str, port: int, schemes: Tuple[str, ...]) -> Tuple[str, httpx.Response]:
+    """
+    Send HEAD over each scheme concurrently and return (scheme, response) for the
+    most preferred scheme that answers. A later scheme's answer is only used once
+    every earlier one has failed: TLS-only servers answer plain HTTP with a fast
+    400, which must not win over a slower HTTPS response.
+    Re-raises the last error when none of them succeed.
+    """
+    tasks = [
+        asyncio.ensure_future(http_client.head(f"{scheme}://{host}:{port}", follow_redirects=True))
+        for scheme in schemes
+    ]
+    error = None
+    try:
+        # Later requests keep running while an earlier scheme is awaited
+        for scheme, task in zip(schemes, tasks):
+            try:
+                return scheme, await task
+            except Exception as e:
+                error = e
+    finally:
+        for task in tasks:
+            # Already-finished losers still get their error retrieved so asyncio
+            # does not log it as never retrieved
+            if not task.cancel() and not task.cancelled():
+                task.exception()
+    raise error
+
+
+async def probe_http_service(host: str, port: int, use_https: bool = False) -> Dict[str, Any]:
     """
     Probe HTTP/HTTPS service to gather headers, detect reverse proxies, and get detailed info.
     
@@ -22,23 +87,33 @@ def probe_http_service(host: str, port: int, use_https: bool = False) -> Dict[st
         'technologies': []
     }
     
-    protocol = 'https' if use_https or port in [443, 8443] else 'http'
+    if use_https or port in _HTTPS_PORTS:
+        schemes = ('https',)
+    elif port in _PLAIN_HTTP_PORTS:
+        schemes = ('http',)
+    else:
+        # Scheme is ambiguous on alternate ports - race both instead of waiting
+        # out an HTTPS timeout before trying plain HTTP
+        schemes = ('https', 'http')
+    protocol = schemes[0]
     url = f"{protocol}://{host}:{port}"
     
     try:
         # Attempt HTTP HEAD request first (faster)
-        print(f"🔍 Probing {url} with HEAD request...")
-        response = requests.head(url, timeout=5, verify=False, allow_redirects=True)
-        result['headers'] = dict(response.headers)
+        logger.debug("🔍 Probing %s:%s with HEAD request (%s)...", host, port, '/'.join(schemes))
+        protocol, response = await _head_first_answer(host, port, schemes)
+        url = f"{protocol}://{host}:{port}"
+        result['headers'] = headers_to_dict(response.headers)
         result['detection_methods'].append('http_head')
         result['confidence'] += 25
         
         # Also try GET for more information
-        print(f"🔍 Probing {url} with GET request...")
-        response_get = requests.get(url, timeout=5, verify=False, allow_redirects=True)
+        logger.debug("🔍 Probing %s with GET request...", url)
+        async with http_client.stream("GET", url, follow_redirects=True) as response_get:
+            banner = await _read_capped_body(response_get)
         if response_get.headers:
-            result['headers'].update(dict(response_get.headers))
-            result['raw_banner'] = response_get.text[:500] if response_get.text else ''
+            result['headers'].update(headers_to_dict(response_get.headers))
+            result['raw_banner'] = banner[:500]
             result['detection_methods'].append('http_get')
             result['confidence'] += 15
         
@@ -49,35 +124,16 @@ def probe_http_service(host: str, port: int, use_https: bool = False) -> Dict[st
         technologies = []
         confidence_boost = 0
         
-        # Detect OpenResty
-        if 'openresty' in server_header:
-            technologies.append({
-                'name': 'OpenResty',
-                'version': extract_version(server_header, 'openresty'),
-                'role': 'web-server',
-                'confidence': 95
-            })
-            confidence_boost += 30
-            
-        # Detect nginx
-        if 'nginx' in server_header and 'openresty' not in server_header:
-            technologies.append({
-                'name': 'nginx',
-                'version': extract_version(server_header, 'nginx'),
-                'role': 'web-server',
-                'confidence': 90
-            })
-            confidence_boost += 30
-            
-        # Detect Apache
-        if 'apache' in server_header:
-            technologies.append({
-                'name': 'Apache',
-                'version': extract_version(server_header, 'apache'),
-                'role': 'web-server',
-                'confidence': 90
-            })
-            confidence_boost += 30
+        # Detect web server software named in the Server header
+        for marker, name, tech_confidence, shadowed_by in _SERVER_TECHNOLOGIES:
+            if marker in server_header and not (shadowed_by and shadowed_by in server_header):
+                technologies.append({
+                    'name': name,
+                    'version': extract_version(server_header, marker),
+                    'role': 'web-server',
+                    'confidence': tech_confidence
+                })
+                confidence_boost += 30
             
         # Detect reverse proxies and CDNs
         proxy_indicators = detect_reverse_proxy(result['headers'])
@@ -107,32 +163,52 @@ def probe_http_service(host: str, port: int, use_https: bool = False) -> Dict[st
         
         # TLS/SSL information for HTTPS
         if protocol == 'https':
-            tls_data = get_tls_info(host, port)
+            tls_data = await asyncio.to_thread(get_tls_info, host, port)
             if tls_data:
                 result['tls_info'] = tls_data
                 result['detection_methods'].append('tls_probe')
                 result['confidence'] += 10
         
-    except requests.exceptions.SSLError as e:
-        print(f"⚠️ SSL error probing {url}: {e}")
+    except httpx.ConnectError as e:
+        if "SSL" not in str(e):
+            logger.warning("❌ Error probing %s: %s", url, e)
+            result['detection_methods'].append('http_probe_failed')
+            return result
+        logger.warning("⚠️ SSL error probing %s: %s", url, e)
         result['detection_methods'].append('http_probe_failed_ssl')
-        # Try without SSL verification
+        # Retry once without following redirects
         try:
-            response = requests.head(url, timeout=5, verify=False)
-            result['headers'] = dict(response.headers)
+            response = await http_client.head(url)
+            result['headers'] = headers_to_dict(response.headers)
             result['confidence'] = 40
-        except:
+        except httpx.HTTPError:
             pass
-    except requests.exceptions.Timeout:
-        print(f"⏰ Timeout probing {url}")
+    except httpx.TimeoutException:
+        logger.warning("⏰ Timeout probing %s", url)
         result['detection_methods'].append('http_probe_timeout')
     except Exception as e:
-        print(f"❌ Error probing {url}: {e}")
+        logger.exception("❌ Error probing %s: %s", url, e)
         result['detection_methods'].append('http_probe_failed')
         
     return result
 
 
+# Headers added by forwarding proxies
+_PROXY_HEADERS = (
+    'via', 'x-forwarded-for', 'x-forwarded-proto', 'x-forwarded-host',
+    'x-real-ip', 'x-proxy-id', 'forwarded'
+)
+
+# (marker headers, provider, type) for CDN/proxy fingerprinting
+_PROXY_PROVIDERS = (
+    (frozenset({'cf-ray', 'cf-cache-status'}), 'Cloudflare', 'CDN'),
+    (frozenset({'x-amz-cf-id', 'x-amz-request-id'}), 'Amazon CloudFront', 'CDN'),
+    (frozenset({'x-azure-ref'}), 'Azure Front Door', 'CDN'),
+    (frozenset({'x-fastly-request-id'}), 'Fastly', 'CDN'),
+    (frozenset({'x-varnish'}), 'Varnish', 'Cache/Reverse Proxy'),
+)
+
+
 def detect_reverse_proxy(headers: Dict[str, str]) -> Dict[str, Any]:
     """
     Detect reverse proxy or CDN based on HTTP headers.
@@ -150,41 +226,17 @@ def detect_reverse_proxy(headers: Dict[str, str]) -> Dict[str, Any]:
     headers_lower = {k.lower(): v for k, v in headers.items()}
     
     # Check for common proxy headers
-    proxy_headers = [
-        'via', 'x-forwarded-for', 'x-forwarded-proto', 'x-forwarded-host',
-        'x-real-ip', 'x-proxy-id', 'forwarded'
-    ]
-    
-    for header in proxy_headers:
+    for header in _PROXY_HEADERS:
         if header in headers_lower:
             proxy_info['detected'] = True
             proxy_info['indicators'].append(f"{header}: {headers_lower[header]}")
     
-    # Detect specific CDN/proxy providers
-    if 'cf-ray' in headers_lower or 'cf-cache-status' in headers_lower:
-        proxy_info['provider'] = 'Cloudflare'
-        proxy_info['type'] = 'CDN'
-        proxy_info['detected'] = True
-        
-    if 'x-amz-cf-id' in headers_lower or 'x-amz-request-id' in headers_lower:
-        proxy_info['provider'] = 'Amazon CloudFront'
-        proxy_info['type'] = 'CDN'
-        proxy_info['detected'] = True
-        
-    if 'x-azure-ref' in headers_lower:
-        proxy_info['provider'] = 'Azure Front Door'
-        proxy_info['type'] = 'CDN'
-        proxy_info['detected'] = True
-        
-    if 'x-fastly-request-id' in headers_lower:
-        proxy_info['provider'] = 'Fastly'
-        proxy_info['type'] = 'CDN'
-        proxy_info['detected'] = True
-        
-    if 'x-varnish' in headers_lower:
-        proxy_info['provider'] = 'Varnish'
-        proxy_info['type'] = 'Cache/Reverse Proxy'
-        proxy_info['detected'] = True
+    # Detect specific CDN/proxy providers (later entries take precedence)
+    for marker_headers, provider, proxy_type in _PROXY_PROVIDERS:
+        if not marker_headers.isdisjoint(headers_lower):
+            proxy_info['provider'] = provider
+            proxy_info['type'] = proxy_type
+            proxy_info['detected'] = True
     
     # Check server header for proxy software
     server = headers_lower.get('server', '').lower()
@@ -241,9 +293,9 @@ def get_tls_info(host: str, port: int) -> Dict[str, Any]:
                     elif 'google' in issuer_org:
                         tls_info['cdn_detected'] = 'Google Cloud CDN'
                     
-                print(f"🔒 TLS info captured for {host}:{port}")
+                logger.debug("🔒 TLS info captured for %s:%s", host, port)
     except Exception as e:
-        print(f"⚠️ Could not get TLS info for {host}:{port}: {e}")
+        logger.warning("⚠️ Could not get TLS info for %s:%s: %s", host, port, e)
         
     return tls_info
 
@@ -265,13 +317,19 @@ def probe_banner(host: str, port: int, timeout: int = 5) -> str:
         banner = sock.recv(1024).decode('utf-8', errors='ignore').strip()
         sock.close()
         
-        print(f"📡 Banner grabbed from {host}:{port}: {banner[:100]}...")
+        logger.info("📡 Banner grabbed from %s:%s: %s...", host, port, banner[:100])
     except Exception as e:
-        print(f"⚠️ Could not grab banner from {host}:{port}: {e}")
+        logger.warning("⚠️ Could not grab banner from %s:%s: %s", host, port, e)
         
     return banner
 
 
+@lru_cache(maxsize=64)
+def _version_pattern(software: str) -> "re.Pattern[str]":
+    """Compiled version pattern for a product name (e.g., 1.27.1.1, 2.4.41)"""
+    return re.compile(rf'{re.escape(software)}[/\s]+(\d+(?:\.\d+)*)', re.IGNORECASE)
+
+
 def extract_version(text: str, software: str) -> str:
     """
     Extract version number from server header or text.
@@ -279,11 +337,7 @@ def extract_version(text: str, software: str) -> str:
     Returns:
         Version string or 'unknown'
     """
-    import re
-    
-    # Pattern to match version numbers (e.g., 1.27.1.1, 2.4.41)
-    pattern = rf'{software}[/\s]+(\d+(?:\.\d+)*)'
-    match = re.search(pattern, text, re.IGNORECASE)
+    match = _version_pattern(software).search(text)
     
     if match:
         return match.group(1)
@@ -310,8 +364,8 @@ def calculate_confidence(nmap_version: str, probe_data: Dict[str, Any]) -> float
     if probe_data.get('headers'):
         confidence += 25
         
-        # Extra boost if server header is present
-        if probe_data['headers'].get('Server'):
+        # Extra boost if server header is present (HTTP/2 sends names lower-cased)
+        if any(name.lower() == 'server' for name in probe_data['headers']):
             confidence += 15
     
     # Boost from TLS info
@@ -5,8 +5,14 @@ Handles IPv4/IPv6 addresses, CIDR notation, hostnames, and IP ranges.
 
 import re
 import ipaddress
+from functools import lru_cache
 from typing import Dict, Optional, Tuple
 
+# Leading dotted digits, used to tell an IP range ("10.0.0.1-20") from a hyphenated hostname
+_IP_RANGE_PREFIX_RE = re.compile(r'^\d+\.\d+')
+
+# RFC 1123 hostname: dot-separated labels of up to 63 alphanumerics/hyphens
+_HOSTNAME_RE = re.compile(r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$')
 
 def normalize_target(user_input: str) -> Dict[str, any]:
     """
@@ -26,8 +32,14 @@ def normalize_target(user_input: str) -> Dict[str, any]:
     Raises:
         ValueError: If target is invalid
     """
-    user_input = user_input.strip()
-    
+    cached = _normalize_target_cached(user_input.strip())
+    # Hand out a copy so callers can annotate the result without touching the cache
+    return {**cached, "warnings": list(cached["warnings"])}
+
+
+@lru_cache(maxsize=4096)
+def _normalize_target_cached(user_input: str) -> Dict[str, any]:
+    """Memoized body of normalize_target; follow-up scans repeat the same targets."""
     if not user_input:
         raise ValueError("Target cannot be empty")
     
@@ -36,7 +48,7 @@ def normalize_target(user_input: str) -> Dict[str, any]:
         raise ValueError("CIDR notation not supported. Please provide a single IP address or hostname.")
     
     # Reject IP ranges
-    if '-' in user_input and re.match(r'^\d+\.\d+', user_input):
+    if '-' in user_input and _IP_RANGE_PREFIX_RE.match(user_input):
         raise ValueError("IP ranges not supported. Please provide a single IP address or hostname.")
     
     # Try to parse as IP address
@@ -145,9 +157,7 @@ def _normalize_hostname(hostname: str) -> Dict[str, any]:
     Basic validation for valid hostname format.
     """
     # Basic hostname validation
-    hostname_pattern = r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$'
-    
-    if not re.match(hostname_pattern, hostname):
+    if not _HOSTNAME_RE.match(hostname):
         raise ValueError(f"Invalid hostname format '{hostname}'")
     
     if len(hostname) > 253:
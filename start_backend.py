@@ -42,9 +42,9 @@ def main():
                     },
                 },
                 "loggers": {
-                    "uvicorn": {"handlers": ["default"], "level": "INFO"},
+                    "uvicorn": {"handlers": ["default"], "level": "INFO", "propagate": False},
                     "uvicorn.error": {"level": "ERROR"},
-                    "uvicorn.access": {"handlers": ["default"], "level": "INFO"},
+                    "uvicorn.access": {"handlers": ["default"], "level": "INFO", "propagate": False},
                 },
             }
         )
@@ -6,6 +6,28 @@ const corsHeaders = {
   'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
 };
 
+// Explanations for a CVE do not change between requests; keep recent ones in the
+// isolate so repeat views skip the AI gateway round-trip (and its cost)
+const ANALYSIS_CACHE_MAX = 500;
+const analysisCache = new Map<string, string>();
+
+// The prompt is built from client-supplied fields, so the cache is keyed on all of
+// them; keying on cveId alone would let one caller's description poison the entry
+async function analysisCacheKey(cveId: string, description: string, cvssScore: unknown): Promise<string> {
+  const input = new TextEncoder().encode(JSON.stringify([cveId, description, cvssScore ?? null]));
+  const digest = await crypto.subtle.digest('SHA-256', input);
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+function cacheAnalysis(cacheKey: string, analysis: string) {
+  analysisCache.delete(cacheKey);
+  analysisCache.set(cacheKey, analysis);
+  if (analysisCache.size > ANALYSIS_CACHE_MAX) {
+    // Map preserves insertion order, so the first key is the least recently used
+    analysisCache.delete(analysisCache.keys().next().value!);
+  }
+}
+
 serve(async (req) => {
   if (req.method === 'OPTIONS') {
     return new Response(null, { headers: corsHeaders });
@@ -21,6 +43,19 @@ serve(async (req) => {
       });
     }
 
+    const cacheKey = await analysisCacheKey(cveId, description, cvssScore);
+    const cached = analysisCache.get(cacheKey);
+    if (cached !== undefined) {
+      console.log('💾 Using cached CVE analysis:', cveId);
+      cacheAnalysis(cacheKey, cached);
+      return new Response(JSON.stringify({ 
+        success: true,
+        response: cached
+      }), {
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+      });
+    }
+
     const LOVABLE_API_KEY = Deno.env.get('LOVABLE_API_KEY');
     if (!LOVABLE_API_KEY) {
       throw new Error('LOVABLE_API_KEY is not configured');
@@ -90,13 +125,16 @@ Use simple words. No technical jargon. Be clear and practical.`;
     }
 
     const data = await response.json();
-    const generatedText = data.choices?.[0]?.message?.content || 'No analysis generated';
+    const generatedText = data.choices?.[0]?.message?.content;
+    if (generatedText) {
+      cacheAnalysis(cacheKey, generatedText);
+    }
 
     console.log('✅ CVE analysis completed successfully');
 
     return new Response(JSON.stringify({ 
       success: true,
-      response: generatedText
+      response: generatedText || 'No analysis generated'
     }), {
       headers: { ...corsHeaders, 'Content-Type': 'application/json' },
     });
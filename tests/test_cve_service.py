@@ -0,0 +1,109 @@
+"""
+Unit tests for CPE handling and CVE scoring in the CVE service
+"""
+
+import pytest
+from services.cve_service import cpe_to_match_string, _build_nvd_queries, _cpe_match_strings, _score_cves
+
+
+def _nvd_vuln(cve_id, criteria, published="2021-10-05T09:15:07.593"):
+    """Build a minimal NVD API 2.0 vulnerability entry"""
+    return {
+        "cve": {
+            "id": cve_id,
+            "published": published,
+            "descriptions": [{"lang": "en", "value": f"{cve_id} description"}],
+            "metrics": {},
+            "configurations": [
+                {"nodes": [{"cpeMatch": [{"vulnerable": True, "criteria": criteria}]}]}
+            ],
+        }
+    }
+
+
+APACHE_2_4_49 = _nvd_vuln("CVE-2021-41773", "cpe:2.3:a:apache:http_server:2.4.49:*:*:*:*:*:*:*")
+APACHE_2_4_50 = _nvd_vuln("CVE-2021-42013", "cpe:2.3:a:apache:http_server:2.4.50:*:*:*:*:*:*:*")
+
+
+class TestCpeToMatchString:
+    """Test converting nmap CPE URIs into NVD match strings"""
+
+    def test_versioned_cpe(self):
+        """Test a versioned CPE 2.2 URI becomes a CPE 2.3 match string"""
+        assert cpe_to_match_string("cpe:/a:apache:http_server:2.4.49") == "cpe:2.3:a:apache:http_server:2.4.49"
+
+    def test_lowercases(self):
+        """Test the match string is lower-cased"""
+        assert cpe_to_match_string("cpe:/a:OpenBSD:OpenSSH:8.2p1") == "cpe:2.3:a:openbsd:openssh:8.2p1"
+
+    def test_extra_parts_dropped(self):
+        """Test components after the version are not part of the match string"""
+        assert cpe_to_match_string("cpe:/a:openbsd:openssh:8.2p1:debian") == "cpe:2.3:a:openbsd:openssh:8.2p1"
+
+    @pytest.mark.parametrize("cpe", [None, "", "cpe:/a:nginx:nginx", "cpe:/a:nginx:nginx:", "nginx 1.18"])
+    def test_unusable_cpe(self, cpe):
+        """Test CPEs without a version or in another format give no match string"""
+        assert cpe_to_match_string(cpe) is None
+
+    def test_vendor_aliases(self):
+        """Test products NVD files under several vendors are queried under each"""
+        assert _cpe_match_strings("cpe:/a:igor_sysoev:nginx:1.18.0") == (
+            "cpe:2.3:a:nginx:nginx:1.18.0", "cpe:2.3:a:f5:nginx:1.18.0"
+        )
+        assert _cpe_match_strings("cpe:/a:apache:http_server:2.4.49") == ("cpe:2.3:a:apache:http_server:2.4.49",)
+        assert _cpe_match_strings("cpe:/a:nginx:nginx") == ()
+
+
+class TestBuildNvdQueries:
+    """Test the keyword searches issued for a service"""
+
+    def test_case_insensitive_dedupe(self):
+        """Test variations differing only in case are searched once, first spelling kept"""
+        assert _build_nvd_queries("Apache httpd") == ("Apache httpd", "apache", "httpd")
+
+    def test_exact_duplicate(self):
+        """Test a service name equal to a variation is searched once"""
+        assert _build_nvd_queries("nginx") == ("nginx",)
+
+
+class TestScoreCves:
+    """Test scoring of NVD results against a service and version"""
+
+    def test_cpe_results_match_on_cpe_product(self):
+        """Test CPE query results are kept even when the service name is not in the CPE"""
+        cves = _score_cves([], "Apache httpd", "2.4.49",
+                           [("cpe:2.3:a:apache:http_server:2.4.49", [APACHE_2_4_49])])
+        assert [cve["id"] for cve in cves] == ["CVE-2021-41773"]
+        assert cves[0]["confidence"] == "high"
+        assert cves[0]["matched_products"] == ["apache:http_server"]
+
+    def test_cpe_results_still_check_version(self):
+        """Test CPE query results for another version are dropped"""
+        cves = _score_cves([], "Apache httpd", "2.4.49",
+                           [("cpe:2.3:a:apache:http_server:2.4.49", [APACHE_2_4_50])])
+        assert cves == []
+
+    def test_keyword_results_match_on_service_name(self):
+        """Test keyword results are matched on the service name"""
+        assert _score_cves([[APACHE_2_4_49]], "Apache httpd", "2.4.49") == []
+        assert [cve["id"] for cve in _score_cves([[APACHE_2_4_49]], "apache", "2.4.49")] == ["CVE-2021-41773"]
+
+    def test_keyword_results_match_on_cpe_product(self):
+        """Test keyword results also match the CPE's product when a CPE was queried"""
+        cves = _score_cves([[APACHE_2_4_49]], "Apache httpd", "2.4.49",
+                           [("cpe:2.3:a:apache:http_server:2.4.49", [])])
+        assert [cve["id"] for cve in cves] == ["CVE-2021-41773"]
+
+    def test_duplicates_across_result_sets(self):
+        """Test a CVE returned by several queries is scored once"""
+        cves = _score_cves([[APACHE_2_4_49], None], "apache", "2.4.49",
+                           [("cpe:2.3:a:apache:http_server:2.4.49", [APACHE_2_4_49])])
+        assert len(cves) == 1
+
+    def test_cpe_and_keyword_results_merged(self):
+        """Test keyword hits are kept alongside CPE results"""
+        nginx_old = _nvd_vuln("CVE-2021-23017", "cpe:2.3:a:nginx:nginx:1.18.0:*:*:*:*:*:*:*")
+        nginx_f5 = _nvd_vuln("CVE-2022-41741", "cpe:2.3:a:f5:nginx:1.18.0:*:*:*:*:*:*:*")
+        cves = _score_cves([[nginx_f5]], "nginx", "1.18.0",
+                           [("cpe:2.3:a:nginx:nginx:1.18.0", [nginx_old])])
+        assert sorted(cve["id"] for cve in cves) == ["CVE-2021-23017", "CVE-2022-41741"]
@@ -0,0 +1,42 @@
+"""
+Unit tests for the on-disk NVD response cache
+"""
+
+import pytest
+from services import nvd_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_db(tmp_path, monkeypatch):
+    """Point the cache at a fresh database for each test"""
+    monkeypatch.setattr(nvd_cache, "NVD_CACHE_PATH", str(tmp_path / "nvd.sqlite"))
+    monkeypatch.setattr(nvd_cache, "_conn", None)
+    monkeypatch.setattr(nvd_cache, "_disabled", False)
+    yield
+    if nvd_cache._conn is not None:
+        nvd_cache._conn.close()
+
+
+class TestNvdCache:
+    """Test storing and expiring cached NVD responses"""
+
+    def test_round_trip(self):
+        """Test a stored response is returned unchanged"""
+        vulns = [{"cve": {"id": "CVE-2021-0001"}}]
+        nvd_cache.store_response("keywordSearch:nginx", vulns)
+        assert nvd_cache.load_response("keywordSearch:nginx") == vulns
+
+    def test_missing_key(self):
+        """Test an unknown key is a miss"""
+        assert nvd_cache.load_response("keywordSearch:unknown") is None
+
+    def test_expired_entry(self):
+        """Test entries past their TTL are not returned"""
+        nvd_cache.store_response("keywordSearch:nginx", [], ttl=-1)
+        assert nvd_cache.load_response("keywordSearch:nginx") is None
+
+    def test_unopenable_path_disables_cache(self, tmp_path, monkeypatch):
+        """Test an unusable database path turns the cache into a no-op"""
+        monkeypatch.setattr(nvd_cache, "NVD_CACHE_PATH", str(tmp_path / "missing" / "nvd.sqlite"))
+        nvd_cache.store_response("keywordSearch:nginx", [])
+        assert nvd_cache.load_response("keywordSearch:nginx") is None
@@ -0,0 +1,78 @@
+"""
+Unit tests for scan request validation
+"""
+
+import pytest
+from pydantic import ValidationError
+from models.scan_models import ScanRequest
+
+
+class TestNmapArgsValidation:
+    """Test nmap argument whitelisting"""
+
+    def test_default_args(self):
+        """Test default timing template is accepted"""
+        request = ScanRequest(ip_address="192.168.1.1")
+        assert request.nmap_args == "-T4"
+
+    def test_frontend_depth_and_profile_args(self):
+        """Test argument strings built by the frontend are accepted"""
+        args = "-T4 -sV -O -p 80,443,8080,8443,3000,5000,8000,9000"
+        request = ScanRequest(ip_address="192.168.1.1", nmap_args=args)
+        assert request.nmap_args == args
+
+    def test_attached_port_spec(self):
+        """Test -p with attached value"""
+        request = ScanRequest(ip_address="192.168.1.1", nmap_args="-p80,443 -F")
+        assert request.nmap_args == "-p80,443 -F"
+
+    def test_value_arg_with_equals(self):
+        """Test value args written as --flag=value"""
+        request = ScanRequest(ip_address="192.168.1.1", nmap_args="--top-ports=100 --min-rate=500")
+        assert request.nmap_args == "--top-ports=100 --min-rate=500"
+
+    def test_value_arg_with_separate_value(self):
+        """Test value args followed by their value"""
+        request = ScanRequest(ip_address="192.168.1.1", nmap_args="--top-ports 100 -T 4")
+        assert request.nmap_args == "--top-ports 100 -T 4"
+
+    def test_script_rejected(self):
+        """Test NSE scripts are rejected"""
+        with pytest.raises(ValidationError, match="Unsafe nmap argument"):
+            ScanRequest(ip_address="192.168.1.1", nmap_args="-sV --script vuln")
+
+    def test_output_to_file_rejected(self):
+        """Test output file flags are rejected"""
+        with pytest.raises(ValidationError, match="Unsafe nmap argument"):
+            ScanRequest(ip_address="192.168.1.1", nmap_args="-oN /tmp/out")
+
+    def test_shell_metacharacters_rejected(self):
+        """Test shell metacharacters are rejected"""
+        with pytest.raises(ValidationError, match="Unsafe nmap argument"):
+            ScanRequest(ip_address="192.168.1.1", nmap_args="-T4; rm -rf /")
+
+    def test_unknown_flag_rejected(self):
+        """Test flags outside the whitelist are rejected"""
+        with pytest.raises(ValidationError, match="not allowed"):
+            ScanRequest(ip_address="192.168.1.1", nmap_args="-T4 --badflag")
+
+
+class TestTargetValidation:
+    """Test target field handling"""
+
+    def test_whitespace_stripped(self):
+        """Test surrounding whitespace is stripped before validation"""
+        request = ScanRequest(ip_address="  192.168.1.0/24 ", nmap_args=" -T4 ")
+        assert request.ip_address == "192.168.1.0/24"
+        assert request.nmap_args == "-T4"
+
+    def test_blank_target_rejected(self):
+        """Test whitespace-only target is rejected"""
+        with pytest.raises(ValidationError, match="cannot be empty"):
+            ScanRequest(ip_address="   ")
+
+    def test_request_is_frozen(self):
+        """Test validated requests cannot be mutated"""
+        request = ScanRequest(ip_address="192.168.1.1")
+        with pytest.raises(ValidationError):
+            request.nmap_args = "--script vuln"